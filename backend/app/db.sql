@@ -93,6 +93,132 @@ ADD COLUMN log_id UUID;
 ADD CONSTRAINT uq_job_log UNIQUE (job_id, log_id, log);
 
 
+      -- Lập lịch DAG: stage theo execution_order (cho phép nhiều task cùng stage)
+      -- và phụ thuộc tường minh theo execution_order của task upstream.
+      ALTER TABLE job_task
+DROP CONSTRAINT IF EXISTS job_task_job_id_execution_order_key;
+
+      ALTER TABLE job_task
+ADD COLUMN depends_on INTEGER[];
+
+      ALTER TABLE jobs
+ADD COLUMN ordered_stages BOOLEAN NOT NULL DEFAULT FALSE;
+
+      -- Thời gian chạy tối đa của job (giây); quá hạn thì query đang chạy bị huỷ.
+      ALTER TABLE jobs
+ADD COLUMN timeout_seconds INTEGER;
+
+      -- Hash cấu hình deployment lần trigger gần nhất; không đổi thì dùng lại deployment_id.
+      ALTER TABLE jobs
+ADD COLUMN deployment_fingerprint TEXT;
+
+
+      -- Trigger bất đồng bộ (POST /jobs/<id>/trigger?async=true): trạng thái
+      -- queued -> running -> succeeded/failed, kết quả trigger trong result.
+      CREATE TABLE job_triggers
+      (
+        id UUID PRIMARY KEY,
+        job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+        mode VARCHAR(20) NOT NULL DEFAULT 'full',
+        status VARCHAR(20) NOT NULL DEFAULT 'queued',
+        result JSONB,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT NOW(),
+        updated_at TIMESTAMP DEFAULT NOW()
+      );
+      CREATE INDEX idx_job_triggers_job_id ON job_triggers(job_id, created_at DESC);
+
+
+      -- Checkpoint theo (flow run, job_task) để resume chỉ chạy lại task lỗi/chưa xong.
+      CREATE TABLE job_run_checkpoints
+      (
+        job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+        run_id UUID NOT NULL,
+        -- flow_run_id của entrypoint flow
+        job_task_id INTEGER NOT NULL REFERENCES job_task(id) ON DELETE CASCADE,
+        task_name TEXT,
+        status TEXT NOT NULL,
+        -- COMPLETED | FAILED | CRASHED ...
+        completed_at TIMESTAMP
+        WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (run_id, job_task_id)
+      );
+
+      CREATE INDEX idx_job_run_checkpoints_job_id ON job_run_checkpoints(job_id);
+
+
+      -- Cache kết quả task idempotent (backend "postgres" của result_cache).
+      CREATE TABLE task_result_cache
+      (
+        cache_key CHAR(64) PRIMARY KEY,
+        result JSONB NOT NULL,
+        expires_at TIMESTAMP
+        WITH TIME ZONE NOT NULL,
+        created_at TIMESTAMP
+        WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+      );
+
+      CREATE INDEX idx_task_result_cache_expires_at ON task_result_cache(expires_at);
+
+
+      -- Telemetry của từng task run (thời gian, DB time, số dòng, CPU, RSS).
+      CREATE TABLE job_task_metrics
+      (
+        id BIGSERIAL PRIMARY KEY,
+        job_id INTEGER NOT NULL,
+        flow_run_id UUID,
+        task_run_id UUID,
+        job_task_id INTEGER,
+        task_name TEXT,
+        status TEXT,
+        cached BOOLEAN NOT NULL DEFAULT FALSE,
+        wall_ms BIGINT,
+        db_ms BIGINT,
+        cpu_ms BIGINT,
+        rows_returned BIGINT,
+        rows_affected BIGINT,
+        peak_rss_delta_kb BIGINT,
+        started_at TIMESTAMP,
+        finished_at TIMESTAMP
+      );
+
+      CREATE INDEX idx_job_task_metrics_job_id ON job_task_metrics(job_id, started_at);
+      CREATE INDEX idx_job_task_metrics_job_task_id ON job_task_metrics(job_task_id);
+
+
+      -- Trạng thái hiện tại của từng task run (running/completed/failed), một dòng
+      -- mỗi task run, upsert bởi flow. job_task_logs chỉ chứa log (sync_job_logs).
+      CREATE TABLE job_task_status
+      (
+        task_run_id UUID PRIMARY KEY,
+        job_id INTEGER NOT NULL,
+        flow_run_id UUID,
+        task_name TEXT,
+        task_status TEXT,
+        log_level TEXT,
+        log TEXT,
+        updated_at TIMESTAMP
+      );
+
+      CREATE INDEX idx_job_task_status_job_id ON job_task_status(job_id, flow_run_id);
+
+
+      -- Snapshot bất biến của danh sách task mỗi lần trigger, flow đọc trực tiếp
+      -- thay vì Prefect Variables.
+      CREATE TABLE job_task_snapshots
+      (
+        job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+        snapshot_hash CHAR(64) NOT NULL,
+        concurrent INTEGER NOT NULL,
+        tasks JSONB NOT NULL,
+        created_at TIMESTAMP
+        WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (job_id, snapshot_hash)
+      );
+
+      CREATE INDEX idx_job_task_snapshots_latest ON job_task_snapshots(job_id, created_at DESC);
+
+
       CREATE TABLE table_list
       (
         db_name TEXT,
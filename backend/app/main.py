@@ -1,3 +1,5 @@
+import os
+import threading
 from flask import Flask
 from flask_cors import CORS
 from routes.job_routes import job_bp
@@ -6,6 +8,7 @@ from routes.import_routes import import_bp
 from routes.auth_routes import auth_bp
 from routes.ai_routes import ai_bp
 from routes.env_config_routes import env_config_bp
+from controllers.job_controller import sync_job_concurrency_limits
 
 app = Flask(__name__)
 CORS(app)
@@ -18,6 +21,19 @@ app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(ai_bp, url_prefix='/api/ai')
 app.register_blueprint(env_config_bp, url_prefix='/api/env-config')
 
+
+def _sync_concurrency_limits_on_startup():
+    try:
+        report = sync_job_concurrency_limits()
+        print(f"[startup] Concurrency limits synced: {report}")
+    except Exception as e:
+        print(f"[startup] Cannot sync concurrency limits: {e}")
+
+
+# Đồng bộ concurrency limit của mọi job khi khởi động (chạy nền, không chặn app).
+if os.getenv("SYNC_CONCURRENCY_LIMITS_ON_STARTUP", "true").lower() == "true":
+    threading.Thread(target=_sync_concurrency_limits_on_startup, daemon=True).start()
+
 if __name__ == '__main__':
     # app.run(debug=True, port=3001)
     app.run(host='0.0.0.0', debug=True, port=3001)
@@ -11,6 +11,8 @@ job_bp.route("/<int:job_id>/logs", methods=["GET"])(require_api_key(job_controll
 job_bp.route("/<int:job_id>", methods=["PUT"])(require_api_key(job_controller.update_job))
 job_bp.route("/<int:job_id>", methods=["DELETE"])(require_api_key(job_controller.delete_job))
 job_bp.route("/<int:job_id>/trigger", methods=["POST"])(require_api_key(job_controller.trigger_job_flow_prefect))
+job_bp.route("/trigger/batch", methods=["POST"])(require_api_key(job_controller.trigger_jobs_bulk))
+job_bp.route("/triggers/<string:trigger_id>", methods=["GET"])(require_api_key(job_controller.get_trigger_status))
 job_bp.route("/<int:job_id>/stream", methods=["GET"])(require_api_key(job_controller.stream_job_logs))
 job_bp.route("/<int:job_id>/tasks", methods=["GET"])(require_api_key(job_controller.get_tasks_by_job_id))
 
@@ -31,6 +33,8 @@ job_bp.route("/<string:deployment_id>/flow-runs", methods=["GET"])(require_api_k
 job_bp.route("/<string:deployment_id>/task-runs", methods=["GET"])(require_api_key(job_controller.get_task_runs))
 job_bp.route("/logs", methods=["POST"])(require_api_key(job_controller.get_logs_for_runs))
 job_bp.route("/<int:job_id>/variables", methods=["GET"])(require_api_key(job_controller.get_job_variables))
+job_bp.route("/prefect-cache/stats", methods=["GET"])(require_api_key(job_controller.get_prefect_cache_stats))
+job_bp.route("/concurrency-limits/sync", methods=["POST"])(require_api_key(job_controller.sync_concurrency_limits))
 
 
 # TABLE
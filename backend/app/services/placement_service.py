@@ -0,0 +1,118 @@
+# placement_service.py
+import os
+import requests
+from dotenv import load_dotenv
+from services.prefect_client import get_prefect_client
+from services.prefect_metadata import TTLCache, PREFECT_METADATA_TTL, get_work_pool
+load_dotenv()
+
+DEFAULT_WORK_POOL = "local-process-pool"
+# Danh sách work pool được phép đặt job, vd "local-process-pool,etl-pool-2"
+WORK_POOLS = [p.strip() for p in os.getenv("PREFECT_WORK_POOLS", DEFAULT_WORK_POOL).split(",") if p.strip()]
+# Trạng thái hàng đợi/worker đổi nhanh: TTL ngắn. Thời gian chạy lịch sử đổi
+# chậm: dùng TTL mặc định của metadata cache (PREFECT_METADATA_TTL).
+PLACEMENT_STATS_TTL = float(os.getenv("PLACEMENT_STATS_TTL", "5"))
+# Giữ pool hiện tại của deployment trừ khi thời gian chờ ước tính gấp hơn
+# hệ số này so với pool tốt nhất (tránh chuyển deployment theo dao động hàng đợi).
+PLACEMENT_REBALANCE_FACTOR = float(os.getenv("PLACEMENT_REBALANCE_FACTOR", "2"))
+ACTIVE_STATES = ["SCHEDULED", "PENDING", "RUNNING"]
+DEFAULT_RUN_SECONDS = 60.0
+
+# Cache riêng cho số liệu placement: hit/miss không lẫn với metadata cache
+# (flow/deployment/work pool) khi xem /api/jobs/prefect-cache/stats.
+placement_cache = TTLCache(ttl=PLACEMENT_STATS_TTL)
+
+
+def _queue_depth(pool):
+    response = get_prefect_client().post("/flow_runs/count", json={
+        "work_pools": {"name": {"any_": [pool]}},
+        "flow_runs": {"state": {"type": {"any_": ACTIVE_STATES}}}
+    })
+    response.raise_for_status()
+    return int(response.json())
+
+
+def _online_workers(pool):
+    response = get_prefect_client().post(f"/work_pools/{pool}/workers/filter", json={"limit": 100})
+    response.raise_for_status()
+    return sum(1 for w in response.json() if (w.get("status") or "ONLINE") == "ONLINE")
+
+
+def _avg_run_seconds(pool, deployment_id=None):
+    body = {
+        "work_pools": {"name": {"any_": [pool]}},
+        "flow_runs": {"state": {"type": {"any_": ["COMPLETED"]}}},
+        "sort": "EXPECTED_START_TIME_DESC",
+        "limit": 50
+    }
+    if deployment_id:
+        body["deployments"] = {"id": {"any_": [deployment_id]}}
+    response = get_prefect_client().post("/flow_runs/filter", json=body)
+    response.raise_for_status()
+    durations = [r["total_run_time"] for r in response.json() if r.get("total_run_time")]
+    return sum(durations) / len(durations) if durations else None
+
+
+def _cached_avg_run_seconds(pool, deployment_id=None):
+    # Không có run COMPLETED nào thì lưu 0 (get_or_load không cache None).
+    avg = placement_cache.get_or_load(("pool_avg_run", f"{pool}:{deployment_id or ''}"),
+                                      lambda: _avg_run_seconds(pool, deployment_id) or 0.0,
+                                      ttl=PREFECT_METADATA_TTL)
+    return avg or None
+
+
+def get_pool_stats(pool, deployment_id=None):
+    """Thống kê một pool, qua placement_cache (xem /api/jobs/prefect-cache/stats)."""
+    avg = None
+    if deployment_id:
+        # Ưu tiên thời gian chạy lịch sử của chính job trên pool này.
+        avg = _cached_avg_run_seconds(pool, deployment_id)
+    if avg is None:
+        avg = _cached_avg_run_seconds(pool)
+
+    return {
+        "pool": pool,
+        "queue_depth": placement_cache.get_or_load(("pool_queue_depth", pool), lambda: _queue_depth(pool)),
+        "workers": placement_cache.get_or_load(("pool_workers", pool), lambda: _online_workers(pool)),
+        "avg_run_seconds": avg if avg is not None else DEFAULT_RUN_SECONDS,
+    }
+
+
+def estimated_wait(stats):
+    # Thời gian chờ ước tính = (số run đang chờ/chạy + run mới) * thời gian chạy TB / số worker.
+    return (stats["queue_depth"] + 1) * stats["avg_run_seconds"] / max(stats["workers"], 1)
+
+
+def choose_work_pool(deployment_id=None, current_pool=None):
+    """
+    Chọn work pool có thời gian chờ ước tính thấp nhất trong WORK_POOLS, dựa
+    trên độ dài hàng đợi, số worker online và thời gian chạy lịch sử. Pool
+    đang pause bị bỏ qua; pool không có worker online chỉ được chọn khi mọi
+    pool đều như vậy. current_pool (pool deployment đang dùng) được giữ nếu
+    còn dùng được, có worker và không quá tải so với pool tốt nhất. Work pool đọc qua metadata cache, số liệu tải qua
+    placement_cache, nên trigger liên tiếp không gọi thêm Prefect trong TTL.
+    """
+    if len(WORK_POOLS) == 1:
+        return WORK_POOLS[0]
+    if current_pool not in WORK_POOLS:
+        current_pool = None
+
+    candidates = []
+    for pool in WORK_POOLS:
+        try:
+            if (get_work_pool(pool) or {}).get("is_paused"):
+                continue
+            candidates.append(get_pool_stats(pool, deployment_id))
+        except requests.RequestException as e:
+            print(f"[placement] Cannot read stats for pool {pool}: {e}")
+
+    if not candidates:
+        return WORK_POOLS[0]
+
+    online = [c for c in candidates if c["workers"] > 0] or candidates
+    best = min(online, key=estimated_wait)
+    current = next((c for c in candidates if c["pool"] == current_pool and c["workers"] > 0), None)
+    if current and estimated_wait(current) <= estimated_wait(best) * PLACEMENT_REBALANCE_FACTOR:
+        return current_pool
+    print(f"[placement] Chose pool {best['pool']} (wait≈{estimated_wait(best):.1f}s) from {candidates}")
+    return best["pool"]
@@ -0,0 +1,140 @@
+# prefect_async.py
+import asyncio
+import json
+import os
+import time
+import httpx
+from dotenv import load_dotenv
+from services.prefect_resilience import (CircuitOpenError, circuit_breaker, request_key,
+                                         single_flight, stale_cache)
+load_dotenv()
+
+PREFECT_API_URL = os.getenv("PREFECT_API_URL")
+# Số request Prefect tối đa chạy đồng thời trong một lần fan-out.
+PREFECT_ASYNC_CONCURRENCY = int(os.getenv("PREFECT_ASYNC_CONCURRENCY", "50"))
+# Timeout của từng request và deadline của cả lần fan-out (giây).
+PREFECT_ASYNC_REQUEST_TIMEOUT = float(os.getenv("PREFECT_ASYNC_REQUEST_TIMEOUT", "10"))
+PREFECT_ASYNC_DEADLINE = float(os.getenv("PREFECT_ASYNC_DEADLINE", "25"))
+
+
+class AsyncPrefectClient:
+    """
+    Client asyncio (httpx) cho các endpoint fan-out nhiều call Prefect: mọi
+    request đi qua một AsyncClient keep-alive, giới hạn bởi semaphore
+    `concurrency`, mỗi request có timeout riêng và cả lần gọi có `deadline`.
+
+        async with AsyncPrefectClient() as client:
+            results = await client.map(fetch_logs, flow_run_ids, default=...)
+    """
+
+    def __init__(self, base_url=PREFECT_API_URL, concurrency=PREFECT_ASYNC_CONCURRENCY,
+                 request_timeout=PREFECT_ASYNC_REQUEST_TIMEOUT, deadline=PREFECT_ASYNC_DEADLINE):
+        self.base_url = (base_url or "").rstrip("/")
+        self.concurrency = max(1, int(concurrency))
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self._client = None
+        self._semaphore = None
+        self._deadline_at = None
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(self.request_timeout),
+            limits=httpx.Limits(max_connections=self.concurrency,
+                                max_keepalive_connections=self.concurrency),
+            headers={"Content-Type": "application/json"},
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._deadline_at = asyncio.get_running_loop().time() + self.deadline if self.deadline else None
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    def remaining(self):
+        """Số giây còn lại tới deadline (None nếu không giới hạn)."""
+        if self._deadline_at is None:
+            return None
+        return max(self._deadline_at - asyncio.get_running_loop().time(), 0.0)
+
+    async def request(self, method, path, **kwargs):
+        # Call đọc trùng nhau (kể cả từ request Flask khác) được gộp; breaker
+        # và bản stale dùng chung với PrefectClient đồng bộ.
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        key = request_key(method, url, kwargs.get("json"))
+        # Kết quả single-flight của client async là bytes, tách key với client đồng bộ.
+        content = await single_flight.do_async(
+            f"async {key}", lambda: self._guarded(method, path, key, kwargs), timeout=self.remaining()
+        )
+        return json.loads(content)
+
+    async def _guarded(self, method, path, key, kwargs):
+        if not circuit_breaker.allow():
+            content = stale_cache.get(key)
+            if content is not None:
+                return content
+            raise CircuitOpenError(f"Prefect circuit breaker is open: {method} {path}")
+
+        started = None
+        ok = False
+        try:
+            async with self._semaphore:
+                remaining = self.remaining()
+                if remaining == 0:
+                    raise asyncio.TimeoutError(f"Prefect fan-out deadline exceeded before {method} {path}")
+                # Đo sau khi có slot: thời gian xếp hàng ở semaphore của mình
+                # không phải độ chậm của Prefect.
+                started = time.monotonic()
+                response = await asyncio.wait_for(self._client.request(method, path, **kwargs), remaining)
+            ok = response.status_code < 500 and response.status_code != 429
+        finally:
+            if started is None:
+                # Chưa gửi tới Prefect: không tính vào breaker, chỉ trả lượt probe.
+                circuit_breaker.abandon()
+            else:
+                circuit_breaker.record(ok, time.monotonic() - started)
+        response.raise_for_status()
+        stale_cache.set(key, response.content)
+        return response.content
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, json=None, **kwargs):
+        return await self.request("POST", path, json=json, **kwargs)
+
+    async def paginate(self, path, body, page_size, max_items):
+        """POST .../filter theo trang (limit/offset) tới khi hết hoặc đủ max_items."""
+        items = []
+        offset = 0
+        while offset < max_items:
+            fetch_size = min(page_size, max_items - offset)
+            batch = await self.post(path, json={**body, "limit": fetch_size, "offset": offset})
+            items.extend(batch)
+            if len(batch) < fetch_size:
+                break
+            offset += fetch_size
+        return items
+
+    async def map(self, fn, items, default=None):
+        """
+        Chạy `await fn(item)` cho mọi item đồng thời (giới hạn bởi semaphore).
+        Có `default(item)` thì item lỗi/quá deadline trả về default thay vì
+        làm hỏng cả lần gọi. Kết quả giữ đúng thứ tự items.
+        """
+        async def run(item):
+            try:
+                return await fn(item)
+            except Exception as e:
+                if default is None:
+                    raise
+                print(f"[prefect_async] {getattr(fn, '__name__', 'call')}({item!r:.80}) failed: {e!r}")
+                return default(item)
+
+        return await asyncio.gather(*(run(item) for item in items))
+
+
+def run_async(coro):
+    """Chạy coroutine từ view Flask đồng bộ (mỗi request một event loop)."""
+    return asyncio.run(coro)
@@ -0,0 +1,155 @@
+# prefect_client.py
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+from services.prefect_resilience import (CircuitOpenError, circuit_breaker, request_key,
+                                         single_flight, stale_cache)
+load_dotenv()
+
+PREFECT_API_URL = os.getenv("PREFECT_API_URL")
+PREFECT_HTTP_POOL_SIZE = int(os.getenv("PREFECT_HTTP_POOL_SIZE", "20"))
+PREFECT_HTTP_CONNECT_TIMEOUT = float(os.getenv("PREFECT_HTTP_CONNECT_TIMEOUT", "3.05"))
+PREFECT_HTTP_READ_TIMEOUT = float(os.getenv("PREFECT_HTTP_READ_TIMEOUT", "30"))
+PREFECT_HTTP_RETRIES = int(os.getenv("PREFECT_HTTP_RETRIES", "3"))
+PREFECT_HTTP_BACKOFF = float(os.getenv("PREFECT_HTTP_BACKOFF", "0.5"))
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# POST chỉ đọc của Prefect API (filter/count) cũng an toàn để thử lại.
+READ_ONLY_POST_SUFFIXES = ("/filter", "/count")
+
+
+class PrefectUnavailable(requests.ConnectionError, CircuitOpenError):
+    """Breaker đang mở và không có bản stale: fail fast thay vì chờ Prefect."""
+
+
+class PrefectClient:
+    """
+    Client dùng chung cho Prefect REST API: một requests.Session với pool
+    connection keep-alive, timeout mặc định cho mọi call và retry có backoff
+    cho call idempotent (GET/PUT/DELETE và POST .../filter, .../count).
+    Thread-safe, dùng chung giữa các request của Flask và thread pool.
+    Call đọc (GET, POST filter/count) giống hệt nhau đang chạy được gộp
+    (single-flight); khi circuit breaker mở, call đọc trả về response thành
+    công gần nhất (header X-Prefect-Stale) hoặc fail fast.
+    """
+
+    def __init__(self, base_url=PREFECT_API_URL, pool_size=PREFECT_HTTP_POOL_SIZE,
+                 timeout=(PREFECT_HTTP_CONNECT_TIMEOUT, PREFECT_HTTP_READ_TIMEOUT),
+                 retries=PREFECT_HTTP_RETRIES, backoff=PREFECT_HTTP_BACKOFF):
+        self.base_url = (base_url or "").rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        # Retry tự làm ở request() để chỉ áp cho call idempotent.
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def url(self, path):
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _is_idempotent(self, method, path):
+        if method in IDEMPOTENT_METHODS:
+            return True
+        return method == "POST" and path.rstrip("/").endswith(READ_ONLY_POST_SUFFIXES)
+
+    def _sleep_before_retry(self, attempt, response=None):
+        delay = self.backoff * (2 ** attempt)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+
+    def _is_read(self, method, path):
+        return method == "GET" or (method == "POST" and path.rstrip("/").endswith(READ_ONLY_POST_SUFFIXES))
+
+    def _stale_response(self, url, content):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.reason = "OK"
+        response._content = content
+        response.headers["Content-Type"] = "application/json"
+        response.headers["X-Prefect-Stale"] = "1"
+        return response
+
+    def request(self, method, path, idempotent=None, **kwargs):
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        if idempotent is None:
+            idempotent = self._is_idempotent(method, path)
+        attempts = self.retries + 1 if idempotent else 1
+        url = self.url(path)
+
+        if not self._is_read(method, path):
+            return self._guarded(method, url, attempts, kwargs)
+        key = request_key(method, url, kwargs.get("json"))
+        return single_flight.do(key, lambda: self._guarded(method, url, attempts, kwargs, key))
+
+    def _guarded(self, method, url, attempts, kwargs, key=None):
+        if not circuit_breaker.allow():
+            content = stale_cache.get(key) if key else None
+            if content is not None:
+                return self._stale_response(url, content)
+            raise PrefectUnavailable(f"Prefect circuit breaker is open: {method} {url}")
+
+        started = time.monotonic()
+        ok = False
+        try:
+            response = self._send(method, url, attempts, kwargs)
+            ok = response.status_code < 500 and response.status_code != 429
+        finally:
+            circuit_breaker.record(ok, time.monotonic() - started)
+        if key and response.status_code == 200:
+            stale_cache.set(key, response.content)
+        return response
+
+    def _send(self, method, url, attempts, kwargs):
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if last:
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+            if response.status_code in RETRY_STATUSES and not last:
+                self._sleep_before_retry(attempt, response)
+                continue
+            return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, json=None, **kwargs):
+        return self.request("POST", path, json=json, **kwargs)
+
+    def patch(self, path, json=None, **kwargs):
+        return self.request("PATCH", path, json=json, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_prefect_client() -> PrefectClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PrefectClient()
+        return _client
@@ -0,0 +1,132 @@
+# prefect_metadata.py
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from services.prefect_client import get_prefect_client
+load_dotenv()
+
+# Flow/deployment/work pool gần như không đổi: cache trong process theo TTL (giây).
+PREFECT_METADATA_TTL = float(os.getenv("PREFECT_METADATA_TTL", "300"))
+
+
+class TTLCache:
+    """
+    Cache key -> value có hạn dùng, thread-safe, đếm hit/miss để đối chiếu
+    số call Prefect tiết kiệm được. Chỉ cache kết quả thành công.
+    """
+
+    def __init__(self, ttl=PREFECT_METADATA_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return True, entry[1]
+            if entry:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+
+    def get_or_load(self, key, loader, ttl=None):
+        found, value = self.get(key)
+        if found:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, kind=None, key=None):
+        """Xoá một entry (kind, key), mọi entry của một kind, hoặc toàn bộ cache."""
+        with self._lock:
+            if kind is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            elif key is None:
+                stale = [k for k in self._entries if k[0] == kind]
+                for k in stale:
+                    del self._entries[k]
+                removed = len(stale)
+            else:
+                removed = 1 if self._entries.pop((kind, key), None) is not None else 0
+            self.invalidations += removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl,
+            }
+
+
+metadata_cache = TTLCache()
+
+
+def _get_json(path):
+    response = get_prefect_client().get(path)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_flow(flow_id):
+    return metadata_cache.get_or_load(("flow", str(flow_id)), lambda: _get_json(f"/flows/{flow_id}"))
+
+
+def get_deployment(deployment_id):
+    return metadata_cache.get_or_load(("deployment", str(deployment_id)),
+                                      lambda: _get_json(f"/deployments/{deployment_id}"))
+
+
+def get_work_pool(work_pool_name):
+    return metadata_cache.get_or_load(("work_pool", work_pool_name),
+                                      lambda: _get_json(f"/work_pools/{work_pool_name}"))
+
+
+def get_flow_id_by_name(flow_name):
+    def load():
+        response = get_prefect_client().post("/flows/filter", json={
+            "flows": {"name": {"any_": [flow_name]}},
+            "limit": 1
+        })
+        response.raise_for_status()
+        data = response.json()
+        return data[0]["id"] if data else None
+
+    return metadata_cache.get_or_load(("flow_name", flow_name), load)
+
+
+async def get_metadata_async(client, kind, key, path):
+    """Bản async cho AsyncPrefectClient (dùng chung cache với bản đồng bộ)."""
+    found, value = metadata_cache.get((kind, str(key)))
+    if found:
+        return value
+    value = await client.get(path)
+    metadata_cache.set((kind, str(key)), value)
+    return value
+
+
+def invalidate_deployment(deployment_id=None):
+    """Gọi sau khi tạo/cập nhật/xoá deployment."""
+    if deployment_id is None:
+        metadata_cache.invalidate("deployment")
+    else:
+        metadata_cache.invalidate("deployment", str(deployment_id))
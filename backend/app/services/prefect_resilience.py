@@ -0,0 +1,211 @@
+# prefect_resilience.py
+import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from dotenv import load_dotenv
+load_dotenv()
+
+# Circuit breaker: mở khi trong `window` call gần nhất (tối thiểu `min_calls`)
+# tỉ lệ lỗi/chậm >= failure_ratio; sau `cooldown` giây cho một call thử lại.
+PREFECT_CB_WINDOW = int(os.getenv("PREFECT_CB_WINDOW", "20"))
+PREFECT_CB_MIN_CALLS = int(os.getenv("PREFECT_CB_MIN_CALLS", "10"))
+PREFECT_CB_FAILURE_RATIO = float(os.getenv("PREFECT_CB_FAILURE_RATIO", "0.5"))
+PREFECT_CB_SLOW_SECONDS = float(os.getenv("PREFECT_CB_SLOW_SECONDS", "5"))
+PREFECT_CB_COOLDOWN = float(os.getenv("PREFECT_CB_COOLDOWN", "30"))
+# Bản sao response đọc thành công gần nhất, dùng khi breaker mở.
+PREFECT_STALE_CACHE_SIZE = int(os.getenv("PREFECT_STALE_CACHE_SIZE", "1000"))
+PREFECT_STALE_MAX_AGE = float(os.getenv("PREFECT_STALE_MAX_AGE", "600"))
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def request_key(method, url, body=None):
+    return f"{method} {url} {json.dumps(body, sort_keys=True, default=str) if body is not None else ''}"
+
+
+class SingleFlight:
+    """
+    Gộp các call giống hệt nhau đang chạy: call đầu tiên (leader) gọi Prefect,
+    các call trùng key chờ và nhận cùng kết quả/lỗi. Dùng được từ thread
+    thường (do) và từ event loop bất kỳ (do_async).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def _claim(self, key):
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.shared += 1
+                return future, False
+            future = concurrent.futures.Future()
+            self._calls[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+        if isinstance(error, asyncio.CancelledError):
+            # Leader bị huỷ (deadline của request khác): call chờ nhận lỗi thường.
+            error = asyncio.TimeoutError("Coalesced Prefect call was cancelled by its leader")
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        future, leader = self._claim(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    async def do_async(self, key, fn, timeout=None):
+        future, leader = self._claim(key)
+        if not leader:
+            # Call chờ giữ deadline của chính nó; shield để timeout không huỷ
+            # future dùng chung của leader và các call chờ khác.
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
+
+
+class CircuitBreaker:
+    """closed -> open (fail fast) -> half_open (1 call thử) -> closed/open."""
+
+    def __init__(self, window=PREFECT_CB_WINDOW, min_calls=PREFECT_CB_MIN_CALLS,
+                 failure_ratio=PREFECT_CB_FAILURE_RATIO, slow_seconds=PREFECT_CB_SLOW_SECONDS,
+                 cooldown=PREFECT_CB_COOLDOWN):
+        self.min_calls = min_calls
+        self.failure_ratio = failure_ratio
+        self.slow_seconds = slow_seconds
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def abandon(self):
+        """Call được allow() nhưng không gửi đi (hết deadline, bị huỷ khi chờ slot)."""
+        with self._lock:
+            if self.state == "half_open":
+                self._probe_in_flight = False
+
+    def _open(self):
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        self.opened += 1
+
+    def record(self, ok, elapsed):
+        # Call chậm hơn slow_seconds tính như lỗi: Prefect quá tải cũng làm
+        # dồn thread Flask như khi lỗi.
+        failed = not ok or elapsed >= self.slow_seconds
+        with self._lock:
+            if self.state == "half_open":
+                if failed:
+                    self._open()
+                else:
+                    self.state = "closed"
+                    self._probe_in_flight = False
+                    self._outcomes.clear()
+                return
+            self._outcomes.append(failed)
+            if (self.state == "closed" and len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) / len(self._outcomes) >= self.failure_ratio):
+                self._open()
+                self._outcomes.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "recent_calls": len(self._outcomes),
+                "recent_failures": sum(self._outcomes),
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+class StaleCache:
+    """LRU key -> (thời điểm, body bytes) của response đọc thành công gần nhất."""
+
+    def __init__(self, maxsize=PREFECT_STALE_CACHE_SIZE, max_age=PREFECT_STALE_MAX_AGE):
+        self.maxsize = maxsize
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.served = 0
+
+    def set(self, key, content):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.max_age:
+                return None
+            self.served += 1
+            return entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "served": self.served, "max_age_seconds": self.max_age}
+
+
+# Dùng chung cho client đồng bộ và async trong process.
+single_flight = SingleFlight()
+circuit_breaker = CircuitBreaker()
+stale_cache = StaleCache()
+
+
+def resilience_stats():
+    return {
+        "circuit_breaker": circuit_breaker.stats(),
+        "single_flight": single_flight.stats(),
+        "stale_cache": stale_cache.stats(),
+    }
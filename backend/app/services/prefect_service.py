@@ -3,6 +3,8 @@ import os
 import requests
 from flask import jsonify
 from dotenv import load_dotenv
+from services.prefect_client import get_prefect_client
+from services.variable_sync import get_variable_mirror
 load_dotenv()
 
 PREFECT_API_URL = os.getenv("PREFECT_API_URL")
@@ -10,51 +12,98 @@ print("PREFECT_API_URL:", PREFECT_API_URL)
 
 
 def upsert_concurrency_limit_for_tag(tag, concurrency_value):
-    delete_endpoint = f"{PREFECT_API_URL}/concurrency_limits/tag/{tag}"
-    create_endpoint = f"{PREFECT_API_URL}/concurrency_limits/"
-
-    try:
-        requests.delete(delete_endpoint)
-    except requests.exceptions.RequestException as e:
-        if e.response and e.response.status_code != 404:
-            raise
+    """
+    Đặt concurrency limit cho tag mà không DELETE trước (DELETE tạo khoảng
+    trống không có limit, run có thể vượt slot): đọc limit hiện tại, chỉ POST
+    (upsert theo tag) khi thiếu hoặc khác giá trị.
+    """
+    client = get_prefect_client()
+
+    response = client.get(f"/concurrency_limits/tag/{tag}")
+    if response.status_code != 404:
+        response.raise_for_status()
+        current = response.json()
+        if current.get("concurrency_limit") == concurrency_value:
+            return current
 
     payload = {
         "tag": tag,
         "concurrency_limit": concurrency_value
     }
-    response = requests.post(create_endpoint, json=payload)
+    response = client.post("/concurrency_limits/", json=payload)
     response.raise_for_status()
     return response.json()
 
 
+def read_concurrency_limits(page_size=200):
+    """Đọc toàn bộ tag concurrency limit hiện có: {tag: concurrency_limit}."""
+    client = get_prefect_client()
+    limits = {}
+    offset = 0
+    while True:
+        response = client.post("/concurrency_limits/filter", json={"limit": page_size, "offset": offset})
+        response.raise_for_status()
+        batch = response.json()
+        for item in batch:
+            limits[item["tag"]] = item["concurrency_limit"]
+        if len(batch) < page_size:
+            return limits
+        offset += page_size
+
+
+def reconcile_concurrency_limits(desired, prune_prefix=None):
+    """
+    desired: {tag: concurrency_limit}. Đọc mọi limit hiện có trong một lượt,
+    chỉ POST tag thiếu hoặc lệch giá trị. prune_prefix (vd "job-"): xoá limit
+    của tag có prefix đó nhưng không còn trong desired (job đã xoá/đổi tên).
+    """
+    current = read_concurrency_limits()
+    client = get_prefect_client()
+    report = {"created": [], "updated": [], "removed": [], "unchanged": 0}
+
+    for tag, value in desired.items():
+        if current.get(tag) == value:
+            report["unchanged"] += 1
+            continue
+        response = client.post("/concurrency_limits/", json={"tag": tag, "concurrency_limit": value})
+        response.raise_for_status()
+        report["updated" if tag in current else "created"].append(tag)
+
+    if prune_prefix:
+        for tag in current:
+            if tag.startswith(prune_prefix) and tag not in desired:
+                response = client.delete(f"/concurrency_limits/tag/{tag}")
+                if response.status_code != 404:
+                    response.raise_for_status()
+                report["removed"].append(tag)
+
+    return report
+
+
 def trigger_prefect_flow(deployment_id, parameters=None, tags=None):
     if not deployment_id:
         raise ValueError("Deployment ID is required")
 
-    url = f"{PREFECT_API_URL}/deployments/{deployment_id}/create_flow_run"
     body = {}
     if parameters:
         body["parameters"] = parameters
     if tags:
         body["tags"] = tags
 
-    response = requests.post(url, json=body)
+    response = get_prefect_client().post(f"/deployments/{deployment_id}/create_flow_run", json=body)
     response.raise_for_status()
     return response.json()
 
 
 def get_flow_run_state(flow_run_id):
-    endpoint = f"{PREFECT_API_URL}/flow_runs/{flow_run_id}"
-    response = requests.get(endpoint)
+    response = get_prefect_client().get(f"/flow_runs/{flow_run_id}")
     response.raise_for_status()
     return response.json()
 
 
 def get_flow_run_logs(flow_run_id):
-    endpoint = f"{PREFECT_API_URL}/flow_runs/{flow_run_id}/logs"
     try:
-        response = requests.post(endpoint, json={})
+        response = get_prefect_client().post(f"/flow_runs/{flow_run_id}/logs", json={})
         response.raise_for_status()
         return response.json()
     except requests.RequestException:
@@ -62,18 +111,5 @@ def get_flow_run_logs(flow_run_id):
 
 
 def upsert_variable(name, value):
-    filter_endpoint = f"{PREFECT_API_URL}/variables/filter"
-    response = requests.post(filter_endpoint, json={"name": {"any_": [name]}, "limit": 100})
-    response.raise_for_status()
-    found = response.json()
-
-    match = next((v for v in found if v["name"] == name), None)
-    if match:
-        patch_url = f"{PREFECT_API_URL}/variables/{match['id']}"
-        requests.patch(patch_url, json={"value": value})
-        return match['id']
-
-    create_url = f"{PREFECT_API_URL}/variables/"
-    create_response = requests.post(create_url, json={"name": name, "value": value})
-    create_response.raise_for_status()
-    return create_response.json()['id']
+    # Qua mirror local: không filter lại theo tên, chỉ ghi khi giá trị đổi.
+    return get_variable_mirror().sync({name: value})["ids"][name]
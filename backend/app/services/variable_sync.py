@@ -0,0 +1,155 @@
+# variable_sync.py
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from services.prefect_client import get_prefect_client
+load_dotenv()
+
+# Ghi snapshot task của job ra Prefect Variables (job_<id>_tasks, job_<id>_concurrent)
+# cho công cụ khác còn đọc Variables; flow đã đọc snapshot từ Postgres.
+PREFECT_VARIABLE_MIRROR = os.getenv("PREFECT_VARIABLE_MIRROR", "false").lower() == "true"
+PREFECT_VARIABLE_PREFIX = os.getenv("PREFECT_VARIABLE_PREFIX", "job_")
+PREFECT_VARIABLE_MIRROR_TTL = float(os.getenv("PREFECT_VARIABLE_MIRROR_TTL", "60"))
+# Giá trị JSON dài hơn ngưỡng (ký tự) được nén gzip + base64.
+PREFECT_VARIABLE_COMPRESS_THRESHOLD = int(os.getenv("PREFECT_VARIABLE_COMPRESS_THRESHOLD", "4096"))
+
+COMPRESSED_PREFIX = "gz:"
+STAMP_TAG_PREFIX = "v:"
+SYNC_TAG = "job-sync"
+
+
+def encode_value(value):
+    raw = json.dumps(value, sort_keys=True, default=str)
+    if len(raw) <= PREFECT_VARIABLE_COMPRESS_THRESHOLD:
+        return value
+    return COMPRESSED_PREFIX + base64.b64encode(gzip.compress(raw.encode("utf-8"))).decode("ascii")
+
+
+def decode_value(value):
+    if isinstance(value, str) and value.startswith(COMPRESSED_PREFIX):
+        return json.loads(gzip.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):])).decode("utf-8"))
+    return value
+
+
+def version_stamp(value):
+    """Stamp theo nội dung (trước khi nén), lưu trong tag "v:<stamp>" của variable."""
+    raw = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class VariableMirror:
+    """
+    Bản sao local {name: (id, stamp)} của các Prefect Variable có prefix,
+    nạp bằng một call /variables/filter và làm mới theo TTL. sync() chỉ
+    PATCH/POST variable có stamp khác, không filter lại từng tên.
+    """
+
+    def __init__(self, prefix=PREFECT_VARIABLE_PREFIX, ttl=PREFECT_VARIABLE_MIRROR_TTL):
+        self.prefix = prefix
+        self.ttl = ttl
+        self._entries = {}
+        self._loaded_at = None
+        self._lock = threading.RLock()
+
+    def refresh(self, force=False, page_size=200):
+        with self._lock:
+            if not force and self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return
+            client = get_prefect_client()
+            entries = {}
+            offset = 0
+            while True:
+                response = client.post("/variables/filter", json={
+                    "variables": {"name": {"like_": f"{self.prefix}%"}},
+                    "limit": page_size,
+                    "offset": offset
+                })
+                response.raise_for_status()
+                batch = response.json()
+                for variable in batch:
+                    stamp = next((t[len(STAMP_TAG_PREFIX):] for t in variable.get("tags") or []
+                                  if t.startswith(STAMP_TAG_PREFIX)), None)
+                    if stamp is None:
+                        # Variable cũ chưa có stamp: tính từ giá trị hiện tại.
+                        stamp = version_stamp(decode_value(variable.get("value")))
+                    entries[variable["name"]] = (variable["id"], stamp)
+                if len(batch) < page_size:
+                    break
+                offset += page_size
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+
+    def _write(self, name, value, stamp, retry=True):
+        client = get_prefect_client()
+        body = {"value": encode_value(value), "tags": [SYNC_TAG, f"{STAMP_TAG_PREFIX}{stamp}"]}
+        entry = self._entries.get(name)
+        if entry:
+            response = client.patch(f"/variables/{entry[0]}", json=body)
+            if response.status_code != 404:
+                response.raise_for_status()
+                self._entries[name] = (entry[0], stamp)
+                return entry[0], "updated"
+        response = client.post("/variables/", json={"name": name, **body})
+        if response.status_code == 409 and retry:
+            # Mirror cũ: variable đã được tạo ở nơi khác, nạp lại rồi PATCH.
+            self._loaded_at = None
+            self.refresh(force=True)
+            return self._write(name, value, stamp, retry=False)
+        response.raise_for_status()
+        variable_id = response.json()["id"]
+        self._entries[name] = (variable_id, stamp)
+        return variable_id, "created"
+
+    def sync(self, desired):
+        """desired: {name: value}. Trả về {"created", "updated", "unchanged", "ids"}."""
+        report = {"created": [], "updated": [], "unchanged": 0, "ids": {}}
+        with self._lock:
+            self.refresh()
+            for name, value in desired.items():
+                stamp = version_stamp(value)
+                entry = self._entries.get(name)
+                if entry and entry[1] == stamp:
+                    report["unchanged"] += 1
+                    report["ids"][name] = entry[0]
+                    continue
+                variable_id, action = self._write(name, value, stamp)
+                report[action].append(name)
+                report["ids"][name] = variable_id
+        return report
+
+
+_mirror = None
+_mirror_lock = threading.Lock()
+
+
+def get_variable_mirror() -> VariableMirror:
+    global _mirror
+    with _mirror_lock:
+        if _mirror is None:
+            _mirror = VariableMirror()
+        return _mirror
+
+
+def job_variables(job_id, concurrent, tasks):
+    return {
+        f"job_{job_id}_tasks": tasks,
+        f"job_{job_id}_concurrent": concurrent,
+    }
+
+
+def mirror_job_variables(jobs):
+    """
+    jobs = [(job_id, concurrent, tasks)]. Đồng bộ Variables của nhiều job trong
+    một lượt khi PREFECT_VARIABLE_MIRROR bật; tắt thì không gọi Prefect.
+    """
+    if not PREFECT_VARIABLE_MIRROR or not jobs:
+        return None
+    desired = {}
+    for job_id, concurrent, tasks in jobs:
+        desired.update(job_variables(job_id, concurrent, tasks))
+    return get_variable_mirror().sync(desired)
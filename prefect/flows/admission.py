@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+
+
+ADMISSION_RATE = float(os.getenv("ADMISSION_RATE", "10"))              # token/giây cho mỗi DB
+ADMISSION_BURST = int(os.getenv("ADMISSION_BURST", "0"))               # 0 = bằng max concurrency
+# Task bị coi là chậm khi latency > baseline (EWMA của chính task đó) * tolerance
+# và lớn hơn floor (giây) — tránh phản ứng với nhiễu của query rất ngắn.
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2"))
+ADMISSION_LATENCY_FLOOR = float(os.getenv("ADMISSION_LATENCY_FLOOR", "1"))
+ADMISSION_EWMA_ALPHA = 0.2
+
+# Lỗi phản ánh DB quá tải: 08 (connection), 53 (insufficient resources),
+# 55P03 (lock_not_available), 57014 (statement timeout), 57P03 (cannot_connect_now).
+PRESSURE_SQLSTATE_CLASSES = ("08", "53")
+PRESSURE_SQLSTATES = {"55P03", "57014", "57P03"}
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Giới hạn tốc độ bắt đầu task: `rate` token/giây, tối đa `burst` token."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = max(rate, 0.001)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_pressure_error(exc: BaseException) -> bool:
+    """Lỗi do DB quá tải (nên giảm concurrency), khác lỗi cú pháp/ràng buộc của user."""
+    if not isinstance(exc, psycopg2.Error):
+        return False
+    code = exc.pgcode
+    if code is None:
+        # Không có SQLSTATE: mất connection phía client.
+        return isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError))
+    return code.startswith(PRESSURE_SQLSTATE_CLASSES) or code in PRESSURE_SQLSTATES
+
+
+class AdaptiveLimiter:
+    """
+    Giới hạn số task chạy đồng thời theo AIMD: tăng dần 1 slot mỗi khi cả
+    cửa sổ hiện tại hoàn thành đúng nhịp, giảm một nửa khi lỗi quá tải hoặc
+    chậm so với baseline của chính task. Mỗi cửa sổ chỉ giảm một lần: task
+    bắt đầu trước lần giảm gần nhất không làm giảm tiếp. Mỗi task thường chỉ
+    chạy một lần trong một run (process), nên baseline được nạp từ lịch sử
+    qua seed_baselines(); task chưa có lịch sử thì mẫu đầu chỉ làm baseline.
+    """
+
+    def __init__(self, max_limit: int, tolerance: float = ADMISSION_LATENCY_TOLERANCE,
+                 floor: float = ADMISSION_LATENCY_FLOOR):
+        self.max_limit = max(1, int(max_limit))
+        self.tolerance = tolerance
+        self.floor = floor
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._baselines = {}
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def seed_baselines(self, baselines: dict):
+        """Nạp baseline từ lịch sử (job_task_metrics); không ghi đè mẫu đã đo trong run."""
+        with self._cond:
+            for key, latency in baselines.items():
+                if latency is not None:
+                    self._baselines.setdefault(key, float(latency))
+
+    def _is_slow(self, key, latency):
+        baseline = self._baselines.get(key)
+        if baseline is None:
+            self._baselines[key] = latency
+            return False
+        self._baselines[key] = baseline + ADMISSION_EWMA_ALPHA * (latency - baseline)
+        return latency > max(self.floor, baseline * self.tolerance)
+
+    def release(self, latency=None, error=False, key=None, started=None):
+        with self._cond:
+            self.in_flight -= 1
+            slow = latency is not None and self._is_slow(key, latency)
+            if error or slow:
+                if started is None or started >= self._last_decrease:
+                    self.limit = max(1.0, self.limit / 2)
+                    self._last_decrease = time.monotonic()
+            elif latency is not None:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def resize(self, max_limit: int):
+        with self._cond:
+            max_limit = max(1, int(max_limit))
+            if max_limit > self.max_limit:
+                self.max_limit = max_limit
+                self._cond.notify_all()
+
+
+class AdmissionController:
+    """Token bucket + AIMD concurrency cho một database đích."""
+
+    def __init__(self, max_concurrency: int):
+        burst = ADMISSION_BURST or max_concurrency
+        self.bucket = TokenBucket(ADMISSION_RATE, burst)
+        self.limiter = AdaptiveLimiter(max_concurrency)
+
+    @contextmanager
+    def admit(self, observe: bool = True, key=None):
+        # observe=False: chiếm slot nhưng không dùng kết quả để điều chỉnh limit
+        # (task không phải SQL, latency/lỗi không phản ánh tải của DB).
+        # key: định danh task để so latency với baseline của chính nó.
+        self.limiter.acquire()
+        try:
+            self.bucket.acquire()
+        except BaseException:
+            self.limiter.release()
+            raise
+
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.limiter.release(error=observe and is_pressure_error(e), key=key, started=started)
+            raise
+        except BaseException:
+            self.limiter.release()
+            raise
+        self.limiter.release(time.monotonic() - started if observe else None, key=key, started=started)
+
+
+def get_admission_controller(db_url: str, max_concurrency: int = 1) -> AdmissionController:
+    with _controllers_lock:
+        controller = _controllers.get(db_url)
+        if controller is None:
+            controller = AdmissionController(max_concurrency)
+            _controllers[db_url] = controller
+            return controller
+    controller.limiter.resize(max_concurrency)
+    return controller
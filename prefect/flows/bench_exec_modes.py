@@ -0,0 +1,56 @@
+# So sánh thời gian chạy Python task CPU-bound ở thread mode và process mode.
+# Chạy: python bench_exec_modes.py --tasks 8 --concurrent 4 --n 300000
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from process_exec import get_executor, run_in_process, shutdown_executor
+
+
+CPU_SCRIPT = """
+total = 0
+for i in range({n}):
+    total += (i * i) % 7
+logger.info(f"total={{total}}")
+"""
+
+
+def run_thread_mode(script, tasks, concurrent):
+    logger = logging.getLogger("bench.thread")
+
+    def run(_):
+        exec(script, {"logger": logger, "db_url": None, "conn": None})
+
+    with ThreadPoolExecutor(max_workers=concurrent) as executor:
+        list(executor.map(run, range(tasks)))
+
+
+def run_process_mode(script, tasks, concurrent):
+    with ThreadPoolExecutor(max_workers=concurrent) as executor:
+        list(executor.map(lambda i: run_in_process(script, f"bench-{i}"), range(tasks)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=8)
+    parser.add_argument("--concurrent", type=int, default=4)
+    parser.add_argument("--n", type=int, default=300000)
+    args = parser.parse_args()
+
+    script = CPU_SCRIPT.format(n=args.n)
+
+    # Pool được khởi động trước, giống worker đã warm khi flow chạy.
+    get_executor()
+    try:
+        for mode, runner in (("thread", run_thread_mode), ("process", run_process_mode)):
+            started = time.perf_counter()
+            runner(script, args.tasks, args.concurrent)
+            elapsed = time.perf_counter() - started
+            print(f"{mode:>8}: {args.tasks} tasks, concurrent={args.concurrent} -> {elapsed:.2f}s")
+    finally:
+        shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# Đo chi phí dựng dynamic flow cho mỗi run theo mô hình process work pool
+# (mỗi flow run là một subprocess mới): import module, dựng flow, và dựng
+# lại qua .with_options(timeout_seconds=...) so với đặt timeout ở decorator.
+# Chạy: python bench_flow_setup.py --runs 5 --concurrent 4
+import argparse
+import subprocess
+import sys
+
+CHILD = """
+import time
+t0 = time.perf_counter()
+from my_flows import create_dynamic_flow
+t1 = time.perf_counter()
+f = create_dynamic_flow({concurrent})
+t2 = time.perf_counter()
+f.with_options(timeout_seconds=60)
+t3 = time.perf_counter()
+create_dynamic_flow({concurrent}, timeout_seconds=60)
+t4 = time.perf_counter()
+print(t1 - t0, t2 - t1, t3 - t2, t4 - t3)
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--concurrent", type=int, default=4)
+    args = parser.parse_args()
+
+    totals = [0.0] * 4
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, "-c", CHILD.format(concurrent=args.concurrent)],
+                             capture_output=True, text=True, check=True).stdout
+        for k, value in enumerate(out.strip().splitlines()[-1].split()):
+            totals[k] += float(value)
+
+    labels = ("import my_flows", "create_dynamic_flow", "+ with_options(timeout)", "decorator timeout")
+    for label, total in zip(labels, totals):
+        print(f"{label:>24}: {total * 1000 / args.runs:.1f} ms/run")
+
+
+if __name__ == "__main__":
+    main()
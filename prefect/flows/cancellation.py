@@ -0,0 +1,102 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import errors
+
+
+APPLICATION_NAME_PREFIX = "prefect-job"
+
+
+def application_name(run_id) -> str:
+    """application_name gắn cho mọi connection SQL task của một flow run (tối đa 63 ký tự)."""
+    return f"{APPLICATION_NAME_PREFIX}:{run_id}"[:63]
+
+
+def remaining_seconds(timeout_seconds=None, deadline=None):
+    """
+    Thời gian còn lại của task: min(timeout của task, thời gian còn lại tới
+    deadline của job). None nếu không có giới hạn nào.
+    """
+    limits = []
+    if timeout_seconds:
+        limits.append(float(timeout_seconds))
+    if deadline:
+        limits.append(deadline - time.time())
+    if not limits:
+        return None
+    return max(min(limits), 0.0)
+
+
+def apply_session_limits(conn, run_id=None, timeout_seconds=None):
+    """
+    Gắn application_name và statement_timeout cho connection của task. Hai giá
+    trị này bị pool xoá (RESET ALL) khi trả connection.
+    """
+    with conn.cursor() as cur:
+        if run_id:
+            cur.execute("SELECT set_config('application_name', %s, false)", (application_name(run_id),))
+        if timeout_seconds is not None:
+            # statement_timeout = 0 nghĩa là không giới hạn: luôn để tối thiểu 1ms.
+            cur.execute("SELECT set_config('statement_timeout', %s, false)",
+                        (str(max(int(timeout_seconds * 1000), 1)),))
+
+
+class TaskTimeout(TimeoutError):
+    pass
+
+
+@contextmanager
+def sql_watchdog(conn, timeout_seconds=None, task_name=""):
+    """
+    Huỷ câu lệnh đang chạy trên `conn` (conn.cancel() ~ pg_cancel_backend) khi
+    hết `timeout_seconds`, kể cả khi task đang ở giữa script nhiều câu lệnh
+    hoặc đang đọc stream. Query bị huỷ do watchdog được báo thành TaskTimeout.
+    """
+    if timeout_seconds is None:
+        yield
+        return
+
+    fired = threading.Event()
+
+    def cancel():
+        fired.set()
+        try:
+            conn.cancel()
+        except psycopg2.Error:
+            pass
+
+    timer = threading.Timer(timeout_seconds, cancel)
+    timer.daemon = True
+    timer.start()
+    try:
+        yield
+    except errors.QueryCanceled as e:
+        if fired.is_set() or "statement timeout" in str(e):
+            raise TaskTimeout(f"Task '{task_name}' exceeded its time limit ({timeout_seconds:.1f}s)") from e
+        raise
+    finally:
+        timer.cancel()
+
+
+def cancel_run_queries(db_url: str, run_id) -> int:
+    """
+    Gọi pg_cancel_backend cho mọi backend còn đang chạy query của flow run
+    (lọc theo application_name). Dùng khi job bị huỷ, crash hoặc quá hạn:
+    thread task có thể vẫn đang chờ DB dù flow đã dừng. Trả về số backend bị huỷ.
+    """
+    conn = psycopg2.connect(db_url)
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT pid, pg_cancel_backend(pid)
+                FROM pg_stat_activity
+                WHERE application_name = %s
+                  AND state <> 'idle'
+                  AND pid <> pg_backend_pid()
+            """, (application_name(run_id),))
+            return sum(1 for _, cancelled in cur.fetchall() if cancelled)
+    finally:
+        conn.close()
@@ -0,0 +1,34 @@
+from db_pool import pooled_connection
+
+
+def load_completed_tasks(db_url: str, job_id: int, resume_from: str, run_id: str) -> set:
+    """
+    Lấy các job_task đã COMPLETED ở run `resume_from` và chép checkpoint sang
+    run hiện tại, để lần resume tiếp theo từ run này vẫn bỏ qua chúng.
+    """
+    with pooled_connection(db_url) as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO job_run_checkpoints (job_id, run_id, job_task_id, task_name, status, completed_at)
+                SELECT job_id, %s, job_task_id, task_name, status, completed_at
+                FROM job_run_checkpoints
+                WHERE job_id = %s AND run_id = %s AND status = 'COMPLETED'
+                ON CONFLICT (run_id, job_task_id) DO NOTHING
+                RETURNING job_task_id
+            """, (run_id, job_id, resume_from))
+            completed = {row[0] for row in cur.fetchall()}
+        conn.commit()
+    return completed
+
+
+def save_checkpoint(db_url: str, job_id: int, run_id: str, job_task_id: int, task_name: str, status: str):
+    with pooled_connection(db_url) as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO job_run_checkpoints (job_id, run_id, job_task_id, task_name, status, completed_at)
+                VALUES (%s, %s, %s, %s, %s, NOW())
+                ON CONFLICT (run_id, job_task_id) DO UPDATE
+                SET status = EXCLUDED.status,
+                    completed_at = EXCLUDED.completed_at
+            """, (job_id, run_id, job_task_id, task_name, status))
+        conn.commit()
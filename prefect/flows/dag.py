@@ -0,0 +1,121 @@
+import heapq
+from typing import Dict, List
+
+
+class TaskGraphError(ValueError):
+    pass
+
+
+class TaskGraph:
+    """
+    Đồ thị phụ thuộc giữa các task của một job.
+
+    Node là vị trí của task trong danh sách; phụ thuộc được khai báo theo
+    execution_order (ổn định khi tạo job). Cạnh lấy từ:
+      - `depends_on`: danh sách execution_order của các task phải xong trước;
+      - stage (khi ordered_stages=True): mọi task thuộc stage (execution_order)
+        nhỏ hơn liền kề phải xong trước.
+    """
+
+    def __init__(self, tasks: List[Dict], ordered_stages: bool = False):
+        self.by_order = {}
+        for index, task_info in enumerate(tasks):
+            key = task_info.get("execution_order")
+            key = index if key is None else int(key)
+            self.by_order.setdefault(key, []).append(index)
+
+        self._items = tasks
+        self.upstream = {i: set() for i in range(len(tasks))}
+
+        if ordered_stages:
+            stages = sorted(self.by_order)
+            for prev_stage, stage in zip(stages, stages[1:]):
+                for i in self.by_order[stage]:
+                    self.upstream[i].update(self.by_order[prev_stage])
+
+        for i, task_info in enumerate(tasks):
+            for dep in task_info.get("depends_on") or []:
+                if int(dep) not in self.by_order:
+                    raise TaskGraphError(
+                        f"Task '{task_info.get('name')}' depends on unknown execution_order {dep}"
+                    )
+                self.upstream[i].update(j for j in self.by_order[int(dep)] if j != i)
+
+        self.downstream = {i: set() for i in range(len(tasks))}
+        for i, ups in self.upstream.items():
+            for u in ups:
+                self.downstream[u].add(i)
+
+        self.order = self._topological_order()
+        self.priority = self._critical_path()
+
+    def _topological_order(self) -> List[int]:
+        indegree = {i: len(ups) for i, ups in self.upstream.items()}
+        queue = [i for i, d in indegree.items() if d == 0]
+        order = []
+        while queue:
+            i = queue.pop()
+            order.append(i)
+            for d in self.downstream[i]:
+                indegree[d] -= 1
+                if indegree[d] == 0:
+                    queue.append(d)
+        if len(order) != len(indegree):
+            cyclic = [self._items[i].get("name") for i, d in indegree.items() if d > 0]
+            raise TaskGraphError(f"Dependency cycle between tasks: {cyclic}")
+        return order
+
+    def _critical_path(self) -> Dict[int, float]:
+        # Độ dài đường dài nhất từ task tới cuối đồ thị (tính cả chính nó);
+        # chi phí mỗi task lấy từ parameters.estimated_seconds, mặc định 1.
+        priority = {}
+        for i in reversed(self.order):
+            params = self._items[i].get("parameters") or {}
+            cost = float(params.get("estimated_seconds", 1))
+            priority[i] = cost + max((priority[d] for d in self.downstream[i]), default=0)
+        return priority
+
+
+class DagScheduler:
+    """Theo dõi task sẵn sàng chạy; task có critical path dài nhất được lấy trước."""
+
+    def __init__(self, graph: TaskGraph, completed=()):
+        # `completed`: task đã xong ở lần chạy trước (resume) — không chạy lại
+        # và được tính là upstream đã hoàn thành.
+        self.graph = graph
+        self.completed = set(completed)
+        self._remaining = {i: len(ups - self.completed) for i, ups in graph.upstream.items()}
+        self._ready = []
+        self.skipped = set()
+        for i, count in self._remaining.items():
+            if count == 0 and i not in self.completed:
+                self._push(i)
+
+    def _push(self, i: int):
+        heapq.heappush(self._ready, (-self.graph.priority[i], i))
+
+    def has_ready(self) -> bool:
+        return bool(self._ready)
+
+    def pop_ready(self) -> int:
+        return heapq.heappop(self._ready)[1]
+
+    def mark_done(self, i: int, succeeded: bool = True):
+        if not succeeded:
+            self._skip_downstream(i)
+            return
+        for d in self.graph.downstream[i]:
+            if d in self.skipped:
+                continue
+            self._remaining[d] -= 1
+            if self._remaining[d] == 0:
+                self._push(d)
+
+    def _skip_downstream(self, i: int):
+        stack = list(self.graph.downstream[i])
+        while stack:
+            d = stack.pop()
+            if d in self.skipped:
+                continue
+            self.skipped.add(d)
+            stack.extend(self.graph.downstream[d])
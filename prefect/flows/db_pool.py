@@ -0,0 +1,158 @@
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import errors
+
+
+# Mỗi worker process giữ một pool cho mỗi DSN, dùng chung giữa các task thread.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class TaskConnectionPool:
+    """
+    Thread-safe pool cho một DSN. Kích thước lấy theo `concurrent` của job;
+    nếu job sau cần nhiều slot hơn thì pool được mở rộng khi lấy ra. Mọi
+    connection trả về đều được giữ mở trong danh sách rảnh (ThreadedConnectionPool
+    đóng connection vượt minconn), connect mới chạy ngoài lock.
+    """
+
+    def __init__(self, dsn: str, maxconn: int):
+        self.dsn = dsn
+        self.maxconn = max(1, int(maxconn))
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._idle = []
+        self._opened = 0  # connection đang mở: rảnh + đang dùng + đang connect
+        self._closed = False
+
+    def resize(self, maxconn: int):
+        maxconn = max(1, int(maxconn))
+        with self._lock:
+            if maxconn <= self.maxconn:
+                return
+            self.maxconn = maxconn
+            self._available.notify_all()
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        # Pool hết slot thì chờ connection được trả về thay vì báo lỗi ngay.
+        with self._available:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._opened < self.maxconn:
+                    self._opened += 1
+                    break
+                self._available.wait(timeout=1)
+        # Giữ chỗ rồi mới connect ngoài lock: handshake không chặn thread khác.
+        try:
+            return psycopg2.connect(self.dsn)
+        except Exception:
+            with self._available:
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+    def getconn(self):
+        # Sau khi DB restart mọi connection rảnh đều chết: bỏ lần lượt, tối đa
+        # maxconn + 1 lần (lần cuối chắc chắn là connection mới).
+        for _ in range(self.maxconn + 1):
+            conn = self._checkout()
+            if self._is_healthy(conn):
+                return conn
+            self._release(conn, close=True)
+        raise psycopg2.OperationalError(f"No healthy connection after {self.maxconn + 1} attempts")
+
+    def _release(self, conn, close: bool = False):
+        close = close or self._closed
+        if close:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+        with self._available:
+            if close:
+                self._opened -= 1
+            else:
+                self._idle.append(conn)
+            self._available.notify()
+
+    def putconn(self, conn, discard: bool = False):
+        if conn.closed:
+            discard = True
+        if not discard:
+            try:
+                self.reset_session(conn)
+            except psycopg2.Error:
+                discard = True
+        self._release(conn, close=discard)
+
+    def reset_session(self, conn):
+        # Trả connection về trạng thái sạch cho task sau: bỏ transaction dở
+        # dang, các SET trong session, prepared statement và temp table.
+        conn.rollback()
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("RESET ALL")
+                cur.execute("DEALLOCATE ALL")
+                cur.execute("DISCARD TEMP")
+        finally:
+            conn.autocommit = False
+
+    def closeall(self):
+        # Connection đang dùng được đóng khi trả về (_closed).
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for conn in idle:
+            try:
+                conn.close()
+            except psycopg2.Error:
+                pass
+
+
+def get_pool(dsn: str, maxconn: int = 1) -> TaskConnectionPool:
+    with _pools_lock:
+        task_pool = _pools.get(dsn)
+        if task_pool is None:
+            task_pool = TaskConnectionPool(dsn, maxconn)
+            _pools[dsn] = task_pool
+            return task_pool
+    task_pool.resize(maxconn)
+    return task_pool
+
+
+@contextmanager
+def pooled_connection(dsn: str, maxconn: int = 1):
+    task_pool = get_pool(dsn, maxconn)
+    conn = task_pool.getconn()
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+        # Query bị huỷ (timeout/cancel) không làm hỏng connection: rollback rồi dùng lại.
+        broken = not isinstance(e, errors.QueryCanceled)
+        raise
+    finally:
+        task_pool.putconn(conn, discard=broken)
+
+
+def close_all_pools():
+    with _pools_lock:
+        for task_pool in _pools.values():
+            task_pool.closeall()
+        _pools.clear()
@@ -0,0 +1,39 @@
+import base64
+import gzip
+import json
+
+from psycopg2.extras import RealDictCursor
+
+from db_pool import pooled_connection
+
+
+def load_job_snapshot(db_url: str, job_id: int, snapshot_hash: str = None):
+    """
+    Đọc snapshot bất biến (concurrent + danh sách task) của job bằng một câu
+    query. Không truyền snapshot_hash (vd run theo schedule) thì lấy snapshot
+    mới nhất. Trả về None nếu job chưa có snapshot.
+    """
+    with pooled_connection(db_url) as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute("""
+                SELECT snapshot_hash, concurrent, tasks
+                FROM job_task_snapshots
+                WHERE job_id = %s
+                  AND (%s::text IS NULL OR snapshot_hash = %s)
+                ORDER BY created_at DESC
+                LIMIT 1
+            """, (job_id, snapshot_hash, snapshot_hash))
+            row = cur.fetchone()
+        conn.commit()
+    return dict(row) if row else None
+
+
+# Backend nén Variable lớn thành "gz:" + base64(gzip(json)) (services/variable_sync.py).
+COMPRESSED_PREFIX = "gz:"
+
+
+def decode_variable_value(value):
+    """Giải nén giá trị Prefect Variable do backend mirror ghi; giá trị thường giữ nguyên."""
+    if isinstance(value, str) and value.startswith(COMPRESSED_PREFIX):
+        return json.loads(gzip.decompress(base64.b64decode(value[len(COMPRESSED_PREFIX):])).decode("utf-8"))
+    return value
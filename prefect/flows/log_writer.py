@@ -0,0 +1,172 @@
+import atexit
+import os
+import threading
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+from db_pool import get_pool
+
+
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "2"))
+
+_active_writer = None
+# Writer dùng khi ghi log ngoài flow run, mỗi DSN một cái, sống tới khi process thoát.
+_fallback_writers = {}
+_fallback_lock = threading.Lock()
+
+
+class BufferedTableWriter:
+    """
+    Gom các dòng insert vào bộ đệm và ghi theo lô bằng execute_values khi đủ
+    `batch_size` dòng hoặc sau `flush_interval` giây. Giữ một connection từ
+    pool suốt vòng đời writer (một flow run). write() chỉ đưa vào bộ đệm; mọi
+    lần ghi DB (trừ lần flush cuối trong close) chạy ở thread flush nền, nên
+    lỗi DB log không bao giờ ném vào task.
+    """
+
+    def __init__(self, db_url: str, insert_sql: str, pool_size: int = 1,
+                 batch_size: int = LOG_BATCH_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL):
+        self.insert_sql = insert_sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pool = get_pool(db_url, pool_size)
+        self._conn = None
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._timer = threading.Thread(target=self._run_timer, daemon=True)
+        self._timer.start()
+        atexit.register(self.close)
+
+    def _run_timer(self):
+        # Flush sau mỗi flush_interval giây, hoặc ngay khi write() báo bộ đệm đầy.
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[{type(self).__name__}] Periodic flush failed: {e}")
+
+    def write(self, row: tuple):
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def prepare_rows(self, rows):
+        """Hook cho lớp con xử lý lô trước khi ghi (mặc định giữ nguyên)."""
+        return rows
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return
+            try:
+                if self._conn is None or self._conn.closed:
+                    self._conn = self._pool.getconn()
+                with self._conn.cursor() as cur:
+                    execute_values(cur, self.insert_sql, self.prepare_rows(rows), page_size=self.batch_size)
+                self._conn.commit()
+            except Exception:
+                # Giữ lại các dòng chưa ghi để lần flush sau thử lại.
+                with self._lock:
+                    self._rows = rows + self._rows
+                self._discard_broken_conn()
+                raise
+
+    def _discard_broken_conn(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.rollback()
+        except Exception:
+            # Connection hỏng: trả slot về pool (đóng), lần flush sau lấy connection mới.
+            conn, self._conn = self._conn, None
+            self._pool.putconn(conn, discard=True)
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wake.set()
+        atexit.unregister(self.close)
+        self._timer.join(timeout=self.flush_interval)
+        try:
+            self.flush()
+        finally:
+            if self._conn is not None:
+                self._pool.putconn(self._conn)
+                self._conn = None
+
+
+class TaskLogWriter(BufferedTableWriter):
+    """
+    Trạng thái task run vào job_task_status: upsert theo task_run_id nên mỗi
+    task run chỉ có một dòng (running -> completed/failed), không chen vào
+    job_task_logs là bảng log mà UI đọc.
+    """
+
+    INSERT_SQL = """
+        INSERT INTO job_task_status (
+            task_run_id, job_id, flow_run_id, task_name, task_status,
+            log_level, log, updated_at
+        ) VALUES %s
+        ON CONFLICT (task_run_id) DO UPDATE
+        SET task_status = EXCLUDED.task_status,
+            log_level = EXCLUDED.log_level,
+            log = EXCLUDED.log,
+            updated_at = EXCLUDED.updated_at
+    """
+
+    def __init__(self, db_url: str, pool_size: int = 1, **kwargs):
+        super().__init__(db_url, self.INSERT_SQL, pool_size=pool_size, **kwargs)
+
+    def prepare_rows(self, rows):
+        # ON CONFLICT DO UPDATE không cho một câu lệnh sửa cùng dòng hai lần:
+        # trong một lô chỉ giữ trạng thái cuối của mỗi task run.
+        latest = {}
+        for row in rows:
+            latest.pop(row[0], None)
+            latest[row[0]] = row
+        return list(latest.values())
+
+    def log(self, job_id, task_run_id, name, status, log="", level="INFO", flow_run_id=None):
+        self.write((task_run_id, job_id, flow_run_id, name, status, level, log, datetime.now()))
+
+
+def start_task_log_writer(db_url: str, pool_size: int = 1) -> TaskLogWriter:
+    global _active_writer
+    _active_writer = TaskLogWriter(db_url, pool_size=pool_size)
+    return _active_writer
+
+
+def get_task_log_writer():
+    return _active_writer
+
+
+def get_fallback_log_writer(db_url: str) -> TaskLogWriter:
+    """Writer dùng lại cho các lần ghi log ngoài flow run (không tạo thread mới mỗi lần)."""
+    with _fallback_lock:
+        writer = _fallback_writers.get(db_url)
+        if writer is None:
+            writer = TaskLogWriter(db_url)
+            _fallback_writers[db_url] = writer
+        return writer
+
+
+def stop_task_log_writer():
+    global _active_writer
+    # Bỏ writer trước khi close: close lỗi thì run sau vẫn tạo writer mới.
+    writer, _active_writer = _active_writer, None
+    if writer is not None:
+        writer.close()
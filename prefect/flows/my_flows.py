@@ -4,22 +4,45 @@ import psycopg2
 from psycopg2.extras import RealDictCursor
 from prefect import flow, task, get_run_logger
 from prefect.task_runners import ThreadPoolTaskRunner
+from prefect.futures import as_completed
 from typing import List, Dict
 from typing_extensions import TypedDict
 from prefect.variables import Variable
 from datetime import datetime
-from prefect.states import State
+from prefect.states import State, Failed
 import json
+from collections import deque
 from typing import List, Optional
 from dotenv import load_dotenv
+from db_pool import pooled_connection, close_all_pools
+from admission import get_admission_controller
+from dag import TaskGraph, DagScheduler
+from sql_stream import stream_select, build_sink, DEFAULT_ITERSIZE
+from sql_script import split_statements, run_statements, execute_parameterized
+from partitioning import expand_partitions, merge_partition_results
+from process_exec import run_in_process, shutdown_executor
+from log_writer import (start_task_log_writer, get_task_log_writer, get_fallback_log_writer,
+                        stop_task_log_writer)
+from prefect.runtime import flow_run, task_run
+from checkpoints import load_completed_tasks, save_checkpoint
+from result_cache import get_result_cache, make_cache_key
+from job_snapshot import load_job_snapshot, decode_variable_value
+from task_metrics import (TaskMetrics, start_metrics_writer, get_metrics_writer, stop_metrics_writer,
+                          load_latency_baselines)
+from cancellation import (TaskTimeout, apply_session_limits, cancel_run_queries,
+                          remaining_seconds, sql_watchdog)
 
 load_dotenv(dotenv_path=".env")
 # Define a TypedDict for task information
 
-class TaskDict(TypedDict):
+class TaskDict(TypedDict, total=False):
     name: str
     script_type: str
     script_content: str
+    job_task_id: int
+    execution_order: int
+    depends_on: List[int]
+    parameters: Dict
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 print(f"Using DATABASE_URL: {DATABASE_URL}")
@@ -27,74 +50,185 @@ if not DATABASE_URL:
     raise EnvironmentError("Missing DATABASE_URL in environment or .env file")
 
 
+def _run_sql(conn, script_content: str, params: Dict, outcome: Dict, metrics: TaskMetrics, logger):
+    if params.get("sql_mode") == "script":
+        # Script nhiều câu lệnh: tách an toàn, chạy từng câu trong cùng transaction
+        # với savepoint để retry riêng câu lỗi, ghi thời gian/số dòng từng câu.
+        statements = split_statements(script_content)
+        logger.info(f"SQL script mode: {len(statements)} statement(s)")
+        with metrics.db_timer():
+            stats = run_statements(conn, statements, int(params.get("statement_retries", 0)), logger)
+        outcome["statements"] = stats
+        outcome["rows_affected"] = metrics.rows_affected = sum(max(st["rows"], 0) for st in stats)
+        slowest = max(stats, key=lambda st: st["seconds"], default=None)
+        if slowest:
+            logger.info(f"Slowest statement #{slowest['index']}: {slowest['seconds']}s")
+        return
+
+    # Task con của partition: bind khoảng [lo, hi) vào %(partition_lo)s / %(partition_hi)s.
+    args = None
+    if "partition_range" in params:
+        lo, hi = params["partition_range"]
+        args = {"partition_lo": lo, "partition_hi": hi}
+
+    if params.get("fetch_mode") == "stream":
+        # SELECT lớn: đọc qua server-side cursor theo lô, không fetchall.
+        itersize = params.get("itersize", DEFAULT_ITERSIZE)
+        with metrics.db_timer():
+            row_count = stream_select(conn, script_content, build_sink(params), itersize, args=args)
+        logger.info(f"Query streamed {row_count} row(s) (itersize={itersize}).")
+        outcome["row_count"] = metrics.rows_returned = row_count
+        return
+
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    with metrics.db_timer():
+        if "sql_args" in params:
+            # SQL có tham số ($1, $2...): PREPARE/EXECUTE trên connection của task.
+            execute_parameterized(cursor, script_content, params["sql_args"])
+        else:
+            cursor.execute(script_content, args)
+        results = cursor.fetchall() if cursor.description else None
+
+    if results is not None:
+        logger.info(f"Query returned {len(results)} row(s).")
+        outcome["row_count"] = metrics.rows_returned = len(results)
+    else:
+        logger.info(f"{cursor.rowcount} row(s) affected.")
+        outcome["rows_affected"] = metrics.rows_affected = cursor.rowcount
+    cursor.close()
+
+
+def _record_metrics(metrics: TaskMetrics, run_ids: Dict, job_task_id, status: str, cached: bool = False):
+    # Không bao giờ ném lỗi: metrics ghi sau commit (lỗi sẽ làm task retry) hoặc
+    # trong nhánh except (lỗi sẽ che lỗi gốc của task).
+    writer = get_metrics_writer()
+    if writer is None:
+        return
+    try:
+        # run_ids["job_task_id"] là task_run_id (UUID của Prefect task run).
+        writer.record(metrics.finish(), run_ids["job_id"], run_ids["flow_run_id"], run_ids["job_task_id"],
+                      job_task_id, run_ids["name"], status, cached=cached)
+    except Exception as e:
+        print(f"[metrics] Cannot record metrics of task '{run_ids['name']}': {e}")
+
+
 @task(name="Execute Single Script", retries=2, retry_delay_seconds=10)
-def execute_script_task(task_info: Dict, db_url: str):
+def execute_script_task(task_info: Dict, db_url: str, pool_size: int = 1,
+                        execution_mode: str = "thread", job_id: Optional[int] = None,
+                        run_id: Optional[str] = None, deadline: Optional[float] = None):
     """
     Thực thi 1 script SQL hoặc Python dựa trên dict task_info.
+    SQL task dùng connection từ pool của worker (theo DSN), kích thước = pool_size.
+    Python task chạy trong thread của flow hoặc ở process pool
+    (parameters.execution_mode của task, mặc định theo execution_mode của job).
+    SQL bị giới hạn bởi parameters.timeout_seconds và deadline (epoch) của job:
+    statement_timeout đặt theo thời gian còn lại, quá hạn thì query bị huỷ.
     """
     logger = get_run_logger()
 
     task_name = task_info.get("name", "Unnamed Task")
     script_type = task_info.get("script_type", "unknown")
     script_content = task_info.get("script_content", "")
+    params = task_info.get("parameters") or {}
 
     logger.info(f"--- Starting Task: '{task_name}' (Type: {script_type}) ---")
-    time.sleep(5)
-    
+    metrics = TaskMetrics()
+    run_ids = {"job_id": job_id, "job_task_id": task_run.id, "name": task_name,
+               "flow_run_id": flow_run.id}
+    insert_task_log(status="running", **run_ids)
+
+    # Cache kết quả (opt-in): parameters.cache = {"ttl": giây, "freshness_key": ..., "backend": "fs"|"postgres"}
+    cache_conf = params.get("cache")
+    result_cache, cache_key = None, None
+    if cache_conf:
+        try:
+            result_cache = get_result_cache(cache_conf.get("backend"), db_url=db_url)
+            cache_key = make_cache_key(script_type, script_content, params, cache_conf.get("freshness_key"))
+            cached = result_cache.get(cache_key)
+        except Exception as e:
+            # Cache lỗi (Postgres, quyền thư mục...) không làm hỏng task: chạy script bình thường.
+            logger.warning(f"Result cache unavailable for task '{task_name}', running without it: {e}")
+            result_cache, cached = None, None
+        if cached is not None:
+            logger.info(f"Task '{task_name}' served from result cache ({cache_key[:12]}).")
+            insert_task_log(status="completed", log="result cache hit", **run_ids)
+            _record_metrics(metrics, run_ids, task_info.get("job_task_id"), "COMPLETED", cached=True)
+            return {**cached, "cached": True}
+
+    outcome = {"task_name": task_name, "status": "COMPLETED"}
     conn = None
     try:
         if script_type == "sql":
             if not db_url:
                 raise ValueError("Database URL was not provided.")
 
-            logger.info("Connecting to database...")
-            conn = psycopg2.connect(db_url)
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-            logger.info(f"Executing SQL: {script_content[:200]}...")
-            cursor.execute(script_content)
-
-            if cursor.description:
-                results = cursor.fetchall()
-                logger.info(f"Query returned {len(results)} row(s).")
-            else:
-                logger.info(f"{cursor.rowcount} row(s) affected.")
-
-            conn.commit()
+            logger.info("Acquiring pooled database connection...")
+            # Admission theo DB đích thay cho sleep cố định; rollback/reset
+            # session được pool làm khi trả connection.
+            admission = get_admission_controller(db_url, pool_size)
+            with admission.admit(key=task_info.get("job_task_id") or task_name), \
+                    pooled_connection(db_url, pool_size) as conn:
+                # Tính sau khi có connection: thời gian chờ slot cũng bị trừ.
+                time_limit = remaining_seconds(params.get("timeout_seconds"), deadline)
+                if time_limit == 0:
+                    raise TaskTimeout(f"Task '{task_name}' reached the job deadline before starting")
+                apply_session_limits(conn, run_id or flow_run.id, time_limit)
+                logger.info(f"Executing SQL: {script_content[:200]}...")
+                with sql_watchdog(conn, time_limit, task_name):
+                    _run_sql(conn, script_content, params, outcome, metrics, logger)
+                conn.commit()
+            conn = None
 
         elif script_type == "python":
-            logger.info("Executing Python script...")
-            exec(script_content, {"logger": logger, "db_url": db_url,"conn": conn})
+            mode = params.get("execution_mode") or execution_mode
+            logger.info(f"Executing Python script ({mode} mode)...")
+            with get_admission_controller(db_url, pool_size).admit(observe=False):
+                if mode == "process":
+                    # Script CPU-bound chạy ở process pool, tránh giữ GIL của flow.
+                    child = run_in_process(script_content, task_name, db_url, log=logger.log)
+                    metrics.extra_cpu_seconds = child["cpu_time"]
+                else:
+                    exec(script_content, {"logger": logger, "db_url": db_url,"conn": conn})
 
         else:
             logger.warning(f"Unknown script type '{script_type}'. Skipping.")
             return {"task_name": task_name, "status": "SKIPPED"}
 
-        logger.info(f"Task '{task_name}' completed successfully.")
-        return {"task_name": task_name, "status": "COMPLETED"}
-
     except Exception as e:
-        if conn:
-            conn.rollback()
-        logger.error(f"Error executing task '{task_name}': {e}", exc_info=True)
+        insert_task_log(status="failed", log=str(e), level="ERROR", **run_ids)
+        _record_metrics(metrics, run_ids, task_info.get("job_task_id"), "FAILED")
         logger.error(f"Error executing task '{task_name}': {e}", exc_info=True)
         logger.error(f"Script content:\n{script_content}") 
         raise
 
-    finally:
-        if conn:
-            conn.close()
+    # Ngoài try: SQL đã commit, ghi log/metrics lỗi không được làm task FAILED
+    # (retry sẽ chạy lại SQL không idempotent).
+    logger.info(f"Task '{task_name}' completed successfully.")
+    insert_task_log(status="completed", **run_ids)
+    _record_metrics(metrics, run_ids, task_info.get("job_task_id"), "COMPLETED")
+    if result_cache is not None:
+        try:
+            result_cache.set(cache_key, outcome, float(cache_conf.get("ttl", 300)))
+        except Exception as e:
+            logger.warning(f"Cannot store result of task '{task_name}' in cache: {e}")
+    return outcome
 
 
-def create_dynamic_flow(concurrent: int):
+def create_dynamic_flow(concurrent: int, timeout_seconds: Optional[int] = None):
     @flow(
         name="dynamic_concurrency_flow",
-        task_runner=ThreadPoolTaskRunner(max_workers=concurrent)
+        task_runner=ThreadPoolTaskRunner(max_workers=concurrent),
+        timeout_seconds=timeout_seconds or None
     )
     def internal_flow(jobId: int,
                       tasks: Optional[List[TaskDict]] = None,
                       concurrent: Optional[int] = None,
-                      db_url: str = DATABASE_URL):
+                      db_url: str = DATABASE_URL,
+                      ordered_stages: bool = False,
+                      python_execution_mode: str = "thread",
+                      run_id: Optional[str] = None,
+                      completed_task_ids: Optional[List[int]] = None,
+                      deadline: Optional[float] = None):
         logger = get_run_logger()
         logger.info(f"=== Job {jobId} START (concurrent={concurrent}) ===")
 
@@ -106,31 +240,103 @@ def create_dynamic_flow(concurrent: int):
 
         logger.info(f"Job {jobId} – tasks = {len(tasks)}, concurrent = {concurrent}")
 
-      
-        futures, task_names = [], []
-        for task_info in tasks:
-            pretty = f"Execute Single Script - {task_info['name']}"
-            fut = (execute_script_task
-                   .with_options(name=pretty)
-                   .submit(task_info, db_url=db_url))
-            futures.append(fut)
-            task_names.append(pretty)
-
-        
-        results = [f.result() for f in futures]    
-        states  = [f.state  for f in futures]
-
-       
-        from pprint import pformat
-        for i, st in enumerate(states):
-            logger.info(f"[TASK {i}] {task_names[i]} - {st.type}")
+        # Baseline latency của từng task lấy từ các run trước (metrics ở DB ứng dụng).
+        try:
+            baselines = load_latency_baselines(DATABASE_URL, jobId)
+            get_admission_controller(db_url, concurrent).limiter.seed_baselines(baselines)
+        except psycopg2.Error as e:
+            logger.warning(f"Cannot load latency baselines of job {jobId}: {e}")
+
+        # Lập lịch theo DAG: task chạy ngay khi upstream xong, ưu tiên task
+        # nằm trên critical path dài nhất để giữ đủ `concurrent` slot bận.
+        graph = TaskGraph(tasks, ordered_stages=ordered_stages)
+        done_ids = set(completed_task_ids or [])
+        resumed = {i for i, t in enumerate(tasks) if t.get("job_task_id") in done_ids}
+        if resumed:
+            logger.info(f"Resume: skipping {len(resumed)} task(s) completed in the previous run")
+        scheduler = DagScheduler(graph, completed=resumed)
+        task_names = [f"Execute Single Script - {t['name']}" for t in tasks]
+        states, results = {}, {}
+        running = {}
+        # Hàng chờ slot: (index task, task_info) — task thường hoặc task con
+        # của một task partition (parameters.partition) chạy song song theo khoảng key.
+        pending = deque()
+        parts_left, part_results, part_state = {}, {}, {}
+
+        def finish(i, state, result):
+            states[i] = state
+            results[i] = result
+            scheduler.mark_done(i, succeeded=state.is_completed())
+            if run_id and tasks[i].get("job_task_id") is not None:
+                # Checkpoint lỗi (DB, FK khi snapshot còn giữ task đã xoá) chỉ
+                # mất khả năng resume task này, không làm hỏng task hay flow.
+                try:
+                    save_checkpoint(db_url, jobId, run_id, tasks[i]["job_task_id"],
+                                    tasks[i]["name"], state.type.value)
+                except Exception as e:
+                    logger.warning(f"Cannot save checkpoint of task '{tasks[i]['name']}': {e}")
+
+        while scheduler.has_ready() or pending or running:
+            while len(running) < concurrent and (pending or scheduler.has_ready()):
+                if not pending:
+                    i = scheduler.pop_ready()
+                    try:
+                        parts = expand_partitions(tasks[i])
+                    except (ValueError, TypeError) as e:
+                        # Spec partition sai: chỉ task này FAILED, DAG chạy tiếp.
+                        logger.error(f"Task '{tasks[i]['name']}' has an invalid partition spec: {e}")
+                        finish(i, Failed(message=str(e)), None)
+                        continue
+                    if parts:
+                        logger.info(f"Task '{tasks[i]['name']}' split into {len(parts)} partition(s)")
+                        parts_left[i] = len(parts)
+                        part_results[i] = []
+                        pending.extend((i, part) for part in parts)
+                    else:
+                        pending.append((i, tasks[i]))
+
+                i, task_info = pending.popleft()
+                task_timeout = (task_info.get("parameters") or {}).get("timeout_seconds")
+                fut = (execute_script_task
+                       .with_options(name=f"Execute Single Script - {task_info['name']}",
+                                     timeout_seconds=task_timeout or None)
+                       .submit(task_info, db_url=db_url, pool_size=concurrent,
+                               execution_mode=python_execution_mode, job_id=jobId,
+                               run_id=run_id, deadline=deadline))
+                running[fut] = i
+
+            if not running:
+                # Mọi task vừa lấy ra đều lỗi ngay (spec partition sai): không có gì để chờ.
+                continue
+            done = next(as_completed(list(running)))
+            i = running.pop(done)
+            state, result = done.state, done.result(raise_on_failure=False)
+
+            if i not in parts_left:
+                finish(i, state, result)
+                continue
+
+            # Task partition: xong khi mọi khoảng con xong, lỗi nếu có khoảng lỗi.
+            part_results[i].append(result if state.is_completed() else None)
+            if part_state.get(i) is None or part_state[i].is_completed():
+                part_state[i] = state
+            parts_left[i] -= 1
+            if parts_left[i] == 0:
+                finish(i, part_state[i], merge_partition_results(tasks[i]["name"], part_results[i]))
+
+        for i, name in enumerate(task_names):
+            if i in resumed:
+                logger.info(f"[TASK {i}] {name} - COMPLETED (previous run)")
+            elif i in scheduler.skipped:
+                logger.warning(f"[TASK {i}] {name} - SKIPPED (upstream failed)")
+            else:
+                logger.info(f"[TASK {i}] {name} - {states[i].type}")
 
-        
-        failed   = [s for s in states if s and s.type == "FAILED"]
-        succeeded = [r for r in results if r]
+        failed = [st for st in states.values() if not st.is_completed()]
+        succeeded = [results[i] for i in sorted(results) if states[i].is_completed() and results[i]]
 
-        if failed:
-            logger.error(f"{len(failed)} task(s) FAILED in job {jobId}")
+        if failed or scheduler.skipped:
+            logger.error(f"{len(failed)} task(s) FAILED, {len(scheduler.skipped)} skipped in job {jobId}")
             raise Exception(f"{len(failed)} task(s) failed")
 
         return {
@@ -143,38 +349,106 @@ def create_dynamic_flow(concurrent: int):
     return internal_flow
 
 
-def insert_task_log(job_id, job_task_id, name, status, log="", db_url=DATABASE_URL):
-    conn = psycopg2.connect(db_url)
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO job_task_logs (job_task_id, job_id, task_name, task_status, log, updated_at)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON CONFLICT (job_task_id) DO UPDATE
-        SET task_status = EXCLUDED.task_status,
-            log = EXCLUDED.log,
-            updated_at = EXCLUDED.updated_at
-    """, (job_task_id, job_id, name, status, log, datetime.now()))
-    conn.commit()
-    cur.close()
-    conn.close()
-    
-
-@flow(name="entrypoint_dynamic_job")
-def multi_task_job_flow(jobId: int):
+def insert_task_log(job_id, job_task_id, name, status, log="", db_url=DATABASE_URL,
+                    level="INFO", flow_run_id=None):
+    """
+    Upsert trạng thái task run vào job_task_status qua writer đệm của flow run
+    hiện tại (flush theo lô, không ném lỗi DB). Ngoài flow run thì ghi ngay qua
+    writer dùng chung của DSN.
+    """
+    writer = get_task_log_writer()
+    if writer is not None:
+        writer.log(job_id, job_task_id, name, status, log, level=level, flow_run_id=flow_run_id)
+        return
+
+    writer = get_fallback_log_writer(db_url)
+    writer.log(job_id, job_task_id, name, status, log, level=level, flow_run_id=flow_run_id)
+    writer.flush()
+
+
+def _cancel_inflight_sql(flow_obj, run, state):
+    # Hook khi flow run bị huỷ/crash: thread task có thể đã bị dừng nhưng
+    # query vẫn chạy trong Postgres, giữ lock và connection slot.
+    try:
+        cancelled = cancel_run_queries(DATABASE_URL, run.id)
+        print(f"[cancel] Flow run {run.id} {state.type.value}: cancelled {cancelled} running query(ies)")
+    except Exception as e:
+        print(f"[cancel] Cannot cancel queries of flow run {run.id}: {e}")
+
+
+@flow(name="entrypoint_dynamic_job",
+      on_cancellation=[_cancel_inflight_sql],
+      on_crashed=[_cancel_inflight_sql])
+def multi_task_job_flow(jobId: int, ordered_stages: bool = False,
+                        python_execution_mode: str = "thread",
+                        resume_from: Optional[str] = None,
+                        snapshot_hash: Optional[str] = None,
+                        timeout_seconds: Optional[int] = None):
+    """
+    snapshot_hash: snapshot task của job trong job_task_snapshots (không có thì
+    lấy snapshot mới nhất).
+    resume_from: flow_run_id của lần chạy trước; các task đã COMPLETED trong
+    run đó (theo job_run_checkpoints) được bỏ qua.
+    timeout_seconds: thời gian chạy tối đa của cả job; quá hạn thì sub-flow
+    timeout và các query còn chạy bị pg_cancel_backend.
+    """
     logger = get_run_logger()
 
-   
     try:
-        concurrent = int(Variable.get(f"job_{jobId}_concurrent"))
-        tasks_json = Variable.get(f"job_{jobId}_tasks")
-        tasks = tasks_json
+        snapshot = load_job_snapshot(DATABASE_URL, jobId, snapshot_hash)
+        if snapshot:
+            concurrent = int(snapshot["concurrent"])
+            tasks = snapshot["tasks"]
+            logger.info(f"Loaded snapshot {snapshot['snapshot_hash'][:12]} for job {jobId}")
+        else:
+            # Job trigger trước khi có snapshot: đọc từ Prefect Variables như cũ.
+            concurrent = int(Variable.get(f"job_{jobId}_concurrent"))
+            tasks = decode_variable_value(Variable.get(f"job_{jobId}_tasks"))
     except Exception as e:
-        logger.error(f"Lỗi khi lấy variables cho job-{jobId}: {e}")
+        logger.error(f"Lỗi khi lấy danh sách task cho job-{jobId}: {e}")
         raise
 
    
-    dyn_flow = create_dynamic_flow(concurrent)
-    result_data = dyn_flow(jobId=jobId, tasks=tasks, db_url=DATABASE_URL)
+    # Process work pool chạy mỗi flow run trong subprocess mới nên flow object
+    # không dùng lại được giữa các run: dựng một lần, timeout đặt luôn ở decorator.
+    dyn_flow = create_dynamic_flow(concurrent, timeout_seconds)
+    # Writer log và writer metrics mỗi cái giữ 1 connection riêng, flow thread
+    # cần thêm 1 để ghi checkpoint: pool = concurrent + 3.
+    start_task_log_writer(DATABASE_URL, pool_size=concurrent + 3)
+    start_metrics_writer(DATABASE_URL, pool_size=concurrent + 3)
+    run_id = str(flow_run.id)
+    deadline = time.time() + timeout_seconds if timeout_seconds else None
+    try:
+        completed_task_ids = []
+        if resume_from:
+            completed_task_ids = sorted(load_completed_tasks(DATABASE_URL, jobId, resume_from, run_id))
+            logger.info(f"Resuming job {jobId} from run {resume_from}: "
+                        f"{len(completed_task_ids)} task(s) already completed")
+
+        result_data = dyn_flow(jobId=jobId, tasks=tasks, concurrent=concurrent,
+                               db_url=DATABASE_URL, ordered_stages=ordered_stages,
+                               python_execution_mode=python_execution_mode,
+                               run_id=run_id, completed_task_ids=completed_task_ids,
+                               deadline=deadline)
+    except BaseException:
+        # Timeout/lỗi của sub-flow không dừng thread task đang chờ DB:
+        # huỷ query của run này để giải phóng lock và connection ngay.
+        try:
+            cancelled = cancel_run_queries(DATABASE_URL, run_id)
+            if cancelled:
+                logger.warning(f"Cancelled {cancelled} in-flight query(ies) of job {jobId}")
+        except psycopg2.Error as e:
+            logger.error(f"Cannot cancel in-flight queries of job {jobId}: {e}")
+        raise
+    finally:
+        # Flush log còn trong bộ đệm (kể cả khi flow lỗi), rồi đóng các
+        # connection SQL task và process pool còn giữ trong worker này. Mỗi
+        # bước chạy riêng: lỗi dọn dẹp không che lỗi thật của flow.
+        for cleanup in (stop_task_log_writer, stop_metrics_writer, close_all_pools, shutdown_executor):
+            try:
+                cleanup()
+            except Exception as e:
+                logger.error(f"Cleanup {cleanup.__name__} failed for job {jobId}: {e}")
     logger.info(f"Kết quả sub-flow job {jobId}: {result_data}")
 
     if "task_names" in result_data:
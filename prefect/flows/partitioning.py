@@ -0,0 +1,110 @@
+import copy
+import os
+import re
+
+
+PARTITION_FILTER_TOKEN = "{{partition_filter}}"
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+# "%%" đã escape, placeholder partition, hoặc một "%" đơn lẻ cần escape (vd LIKE 'a%').
+_PERCENT_TOKEN = re.compile(r"%%|%\(partition_(?:lo|hi)\)s|%")
+
+
+def split_range(start: int, end: int, parts: int):
+    """Chia [start, end) thành tối đa `parts` khoảng con liên tiếp, gần đều nhau."""
+    start, end, parts = int(start), int(end), max(1, int(parts))
+    if end <= start:
+        raise ValueError(f"Invalid partition range [{start}, {end})")
+    total = end - start
+    parts = min(parts, total)
+    step, extra = divmod(total, parts)
+    ranges = []
+    lo = start
+    for p in range(parts):
+        hi = lo + step + (1 if p < extra else 0)
+        ranges.append((lo, hi))
+        lo = hi
+    return ranges
+
+
+def partition_sql(script_content: str, key: str) -> str:
+    """
+    Thay {{partition_filter}} bằng điều kiện khoảng trên cột `key`. Script cũng
+    có thể tự dùng %(partition_lo)s / %(partition_hi)s (khoảng nửa mở [lo, hi)).
+    """
+    if PARTITION_FILTER_TOKEN not in script_content:
+        return script_content
+    if not key or not _IDENTIFIER.match(key):
+        raise ValueError(f"Invalid partition key '{key}'")
+    condition = f"({key} >= %(partition_lo)s AND {key} < %(partition_hi)s)"
+    return script_content.replace(PARTITION_FILTER_TOKEN, condition)
+
+
+def escape_literal_percent(script: str) -> str:
+    """
+    Task con chạy với tham số nên psycopg2 coi "%" là placeholder: nhân đôi các
+    "%" đơn lẻ của người dùng, giữ nguyên "%%" đã escape và
+    %(partition_lo)s / %(partition_hi)s.
+    """
+    return _PERCENT_TOKEN.sub(lambda m: "%%" if m.group() == "%" else m.group(), script)
+
+
+def partition_sink_path(path: str, lo: int, hi: int) -> str:
+    """out.csv -> out.part_<lo>_<hi>.csv: mỗi task con ghi file riêng."""
+    base, ext = os.path.splitext(path)
+    return f"{base}.part_{lo}_{hi}{ext}"
+
+
+def expand_partitions(task_info: dict):
+    """
+    parameters.partition = {"key", "start", "end", "parts"} -> danh sách task
+    con, mỗi task mang parameters.partition_range = [lo, hi]. Trả về [] nếu
+    task không khai báo partition; spec sai thì ValueError. SQL viết như bình
+    thường ("%" trong literal được escape tự động). Với fetch_mode=stream và
+    sink_path, mỗi task con ghi ra file riêng (partition_sink_path).
+    """
+    params = task_info.get("parameters") or {}
+    spec = params.get("partition")
+    if not spec or task_info.get("script_type") != "sql":
+        return []
+    if params.get("sql_mode") == "script" or "sql_args" in params:
+        raise ValueError(
+            f"Partitioned task '{task_info.get('name')}' cannot use sql_mode=script or sql_args"
+        )
+
+    script = partition_sql(task_info["script_content"], spec.get("key"))
+    if "%(partition_lo)s" not in script or "%(partition_hi)s" not in script:
+        raise ValueError(
+            f"Partitioned task '{task_info.get('name')}' must use {PARTITION_FILTER_TOKEN} "
+            "or %(partition_lo)s / %(partition_hi)s in its SQL"
+        )
+    script = escape_literal_percent(script)
+
+    parts = []
+    if "start" not in spec or "end" not in spec:
+        raise ValueError(f"Partitioned task '{task_info.get('name')}' needs partition.start and partition.end")
+    for lo, hi in split_range(spec["start"], spec["end"], spec.get("parts", 4)):
+        part = copy.deepcopy(task_info)
+        part["script_content"] = script
+        part["name"] = f"{task_info['name']} [{lo}, {hi})"
+        part_params = {k: v for k, v in params.items() if k != "partition"}
+        part_params["partition_range"] = [lo, hi]
+        if params.get("fetch_mode") == "stream" and params.get("sink_path"):
+            part_params["sink_path"] = partition_sink_path(params["sink_path"], lo, hi)
+        part["parameters"] = part_params
+        parts.append(part)
+    return parts
+
+
+def merge_partition_results(task_name: str, results):
+    """Gộp kết quả các task con: cộng số dòng, trạng thái COMPLETED khi tất cả xong."""
+    merged = {"task_name": task_name, "status": "COMPLETED", "partitions": len(results)}
+    for result in results:
+        if not isinstance(result, dict):
+            merged["status"] = "FAILED"
+            continue
+        if result.get("status") != "COMPLETED":
+            merged["status"] = result.get("status", "FAILED")
+        for field in ("row_count", "rows_affected"):
+            if field in result:
+                merged[field] = merged.get(field, 0) + max(result[field] or 0, 0)
+    return merged
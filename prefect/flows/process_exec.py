@@ -0,0 +1,107 @@
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+
+PYTHON_PROCESS_POOL_SIZE = int(os.getenv("PYTHON_PROCESS_POOL_SIZE", "0")) or os.cpu_count() or 1
+# Module import sẵn trong mỗi worker process, vd "pandas,numpy".
+PYTHON_PROCESS_PRELOAD = [m.strip() for m in os.getenv("PYTHON_PROCESS_PRELOAD", "").split(",") if m.strip()]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class ScriptError(RuntimeError):
+    """Lỗi xảy ra trong script chạy ở worker process (kèm traceback gốc)."""
+
+
+class _CaptureHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record.levelno, self.format(record)))
+
+
+def _preload():
+    for module in PYTHON_PROCESS_PRELOAD:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+
+def _ping(_=None):
+    return os.getpid()
+
+
+def run_script(script_content: str, task_name: str, db_url: str = None):
+    """
+    Chạy trong worker process: exec script với logger thu lại log để gửi về
+    flow. Trả về dict {"logs": [(level, message)], "error": traceback | None,
+    "cpu_time": giây CPU của script}.
+    """
+    # Một logger cố định cho mọi script (worker process chạy lần lượt từng
+    # script); tên task đi qua `extra` thay vì tạo logger mới cho mỗi task.
+    base_logger = logging.getLogger("script")
+    base_logger.setLevel(logging.DEBUG)
+    base_logger.propagate = False
+    handler = _CaptureHandler()
+    base_logger.addHandler(handler)
+    logger = logging.LoggerAdapter(base_logger, {"task_name": task_name})
+    error = None
+    cpu_start = time.process_time()
+    try:
+        exec(script_content, {"logger": logger, "db_url": db_url, "conn": None})
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        base_logger.removeHandler(handler)
+    return {"logs": handler.records, "error": error, "cpu_time": time.process_time() - cpu_start}
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Pool process dùng chung giữa các task của một flow run, khởi động sẵn toàn
+    bộ process. Với process work pool mỗi flow run là một subprocess riêng nên
+    pool sống theo run và được shutdown_executor() đóng khi run kết thúc.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=PYTHON_PROCESS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_preload,
+            )
+            # Làm nóng: buộc pool spawn đủ process trước khi task đầu tiên tới.
+            list(_executor.map(_ping, range(PYTHON_PROCESS_POOL_SIZE)))
+        return _executor
+
+
+def run_in_process(script_content: str, task_name: str, db_url: str = None, log=None):
+    """
+    Gửi script sang process pool và chờ kết quả. `log(level, message)` nhận
+    lại từng dòng log của script; lỗi trong script được ném lại dưới dạng
+    ScriptError.
+    """
+    outcome = get_executor().submit(run_script, script_content, task_name, db_url).result()
+    if log:
+        for level, message in outcome["logs"]:
+            log(level, message)
+    if outcome["error"]:
+        raise ScriptError(f"Script '{task_name}' failed in worker process:\n{outcome['error']}")
+    return outcome
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
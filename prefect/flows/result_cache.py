@@ -0,0 +1,105 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from psycopg2.extras import Json
+
+from db_pool import pooled_connection
+
+
+TASK_RESULT_CACHE_BACKEND = os.getenv("TASK_RESULT_CACHE_BACKEND", "fs")
+TASK_RESULT_CACHE_DIR = os.getenv("TASK_RESULT_CACHE_DIR", ".task_cache")
+
+
+def make_cache_key(script_type: str, script_content: str, params: dict, freshness_key=None) -> str:
+    """Khoá cache = hash(script, tham số của task, freshness_key do người dùng đặt)."""
+    material = {
+        "script_type": script_type,
+        "script": script_content,
+        "params": {k: v for k, v in (params or {}).items() if k != "cache"},
+        "freshness_key": freshness_key,
+    }
+    payload = json.dumps(material, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FileSystemResultCache:
+    """Mỗi kết quả là một file JSON {expires_at, result} trong thư mục cache."""
+
+    def __init__(self, directory: str = TASK_RESULT_CACHE_DIR, **_):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) < time.time():
+            return None
+        return entry.get("result")
+
+    def set(self, key, result, ttl: float):
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"expires_at": time.time() + ttl, "result": result}, f, default=str)
+        os.replace(tmp_path, self._path(key))
+
+
+class PostgresResultCache:
+    """Lưu kết quả trong bảng task_result_cache (dùng chung giữa các worker)."""
+
+    def __init__(self, db_url: str = None, **_):
+        if not db_url:
+            raise ValueError("Postgres result cache requires a database URL.")
+        self.db_url = db_url
+
+    def get(self, key):
+        with pooled_connection(self.db_url) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT result FROM task_result_cache WHERE cache_key = %s AND expires_at > NOW()",
+                    (key,),
+                )
+                row = cur.fetchone()
+            conn.commit()
+        return row[0] if row else None
+
+    def set(self, key, result, ttl: float):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        with pooled_connection(self.db_url) as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO task_result_cache (cache_key, result, expires_at)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (cache_key) DO UPDATE
+                    SET result = EXCLUDED.result,
+                        expires_at = EXCLUDED.expires_at,
+                        created_at = NOW()
+                """, (key, Json(result), expires_at))
+            conn.commit()
+
+
+BACKENDS = {
+    "fs": FileSystemResultCache,
+    "postgres": PostgresResultCache,
+}
+
+
+def register_backend(name: str, factory):
+    """Đăng ký backend khác; factory(db_url=...) trả về object có get/set."""
+    BACKENDS[name] = factory
+
+
+def get_result_cache(backend: str = None, db_url: str = None):
+    backend = backend or TASK_RESULT_CACHE_BACKEND
+    factory = BACKENDS.get(backend)
+    if factory is None:
+        raise ValueError(f"Unknown result cache backend '{backend}'. Available: {list(BACKENDS)}")
+    return factory(db_url=db_url)
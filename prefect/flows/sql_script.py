@@ -0,0 +1,164 @@
+import re
+import time
+
+import psycopg2
+
+
+# Lỗi thử lại được ở mức savepoint: deadlock_detected và lock_not_available
+# (lock_timeout). 40001 (serialization_failure) không nằm ở đây: snapshot của
+# transaction không đổi nên chạy lại câu lệnh vẫn lỗi; task lỗi và retry của
+# Prefect chạy lại cả transaction.
+RETRYABLE_PGCODES = {"40P01", "55P03"}
+
+_DOLLAR_TAG = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)?\$")
+
+
+def split_statements(sql: str):
+    """
+    Tách script thành các câu lệnh theo dấu `;` ở mức ngoài cùng. Bỏ qua `;`
+    nằm trong chuỗi '...', E'...', định danh "...", dollar-quote $tag$...$tag$,
+    comment `--` và `/* */` (cho phép lồng nhau như Postgres).
+    """
+    statements = []
+    start = 0
+    i = 0
+    n = len(sql)
+    has_code = False
+
+    while i < n:
+        ch = sql[i]
+        nxt = sql[i + 1] if i + 1 < n else ""
+
+        if ch == "-" and nxt == "-":
+            end = sql.find("\n", i)
+            i = n if end == -1 else end + 1
+            continue
+
+        if ch == "/" and nxt == "*":
+            depth = 1
+            i += 2
+            while i < n and depth:
+                if sql.startswith("/*", i):
+                    depth += 1
+                    i += 2
+                elif sql.startswith("*/", i):
+                    depth -= 1
+                    i += 2
+                else:
+                    i += 1
+            continue
+
+        if ch == "'":
+            # E'...' cho phép escape bằng backslash.
+            backslash = i > 0 and sql[i - 1] in "eE" and (i < 2 or not (sql[i - 2].isalnum() or sql[i - 2] == "_"))
+            i += 1
+            while i < n:
+                if backslash and sql[i] == "\\":
+                    i += 2
+                    continue
+                if sql[i] == "'":
+                    if i + 1 < n and sql[i + 1] == "'":
+                        i += 2
+                        continue
+                    break
+                i += 1
+            i += 1
+            has_code = True
+            continue
+
+        if ch == '"':
+            end = i + 1
+            while True:
+                end = sql.find('"', end)
+                if end == -1 or not sql.startswith('""', end):
+                    break
+                end += 2
+            i = n if end == -1 else end + 1
+            has_code = True
+            continue
+
+        if ch == "$":
+            match = _DOLLAR_TAG.match(sql, i)
+            # $1, $2 là tham số, không phải dollar-quote.
+            if match and not (i > 0 and (sql[i - 1].isalnum() or sql[i - 1] == "_")):
+                tag = match.group(0)
+                end = sql.find(tag, match.end())
+                i = n if end == -1 else end + len(tag)
+                has_code = True
+                continue
+
+        if ch == ";":
+            if has_code:
+                statements.append(sql[start:i].strip())
+            start = i + 1
+            has_code = False
+            i += 1
+            continue
+
+        if not ch.isspace():
+            has_code = True
+        i += 1
+
+    if has_code:
+        statements.append(sql[start:].strip())
+    return statements
+
+
+def _is_retryable(error) -> bool:
+    return getattr(error, "pgcode", None) in RETRYABLE_PGCODES
+
+
+def run_statements(conn, statements, retries: int = 0, logger=None):
+    """
+    Chạy lần lượt các câu lệnh trong cùng một transaction. Mỗi câu lệnh được
+    bọc bởi SAVEPOINT: lỗi lock/deadlock chỉ rollback và chạy lại câu lệnh đó
+    (tối đa `retries` lần) thay vì cả script. Trả về thống kê theo câu lệnh.
+    Commit/rollback transaction do caller quyết định.
+    """
+    stats = []
+    with conn.cursor() as cur:
+        for index, statement in enumerate(statements):
+            attempt = 0
+            while True:
+                attempt += 1
+                cur.execute("SAVEPOINT task_stmt")
+                started = time.perf_counter()
+                try:
+                    cur.execute(statement)
+                    # SELECT: rowcount là số dòng trả về, không cần fetch về Python.
+                    rows = cur.rowcount
+                    cur.execute("RELEASE SAVEPOINT task_stmt")
+                    break
+                except psycopg2.Error as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT task_stmt")
+                    if attempt > retries or not _is_retryable(e):
+                        raise
+                    if logger:
+                        logger.warning(f"Statement {index + 1} failed ({e.pgcode}), retry {attempt}/{retries}")
+
+            elapsed = time.perf_counter() - started
+            stats.append({
+                "index": index + 1,
+                "statement": statement[:200],
+                "seconds": round(elapsed, 4),
+                "rows": rows,
+                "attempts": attempt,
+            })
+            if logger:
+                logger.info(f"[stmt {index + 1}/{len(statements)}] {elapsed:.3f}s, {rows} row(s): {statement[:80]}")
+    return stats
+
+
+def execute_parameterized(cur, sql: str, args):
+    """
+    Chạy SQL có tham số kiểu Postgres ($1, $2, ...) bằng PREPARE + EXECUTE.
+    Statement chỉ sống tới khi connection trả về pool (reset_session chạy
+    DEALLOCATE ALL), nên dùng một tên cố định.
+    """
+    args = list(args or [])
+    cur.execute(f"PREPARE task_stmt AS {sql}")
+    if args:
+        placeholders = ", ".join(["%s"] * len(args))
+        cur.execute(f"EXECUTE task_stmt ({placeholders})", args)
+    else:
+        cur.execute("EXECUTE task_stmt")
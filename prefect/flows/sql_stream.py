@@ -0,0 +1,81 @@
+import csv
+import uuid
+
+
+DEFAULT_ITERSIZE = 2000
+
+
+class CountSink:
+    """Chỉ đếm số dòng, không giữ lại dữ liệu."""
+
+    def open(self, columns):
+        pass
+
+    def write(self, row):
+        pass
+
+    def close(self):
+        pass
+
+
+class CsvSink:
+    """Ghi từng dòng ra file CSV (sink_path) trong lúc đọc từ cursor."""
+
+    def __init__(self, path: str):
+        if not path:
+            raise ValueError("CSV sink requires 'sink_path' in task parameters.")
+        self.path = path
+        self._file = None
+        self._writer = None
+
+    def open(self, columns):
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, row):
+        self._writer.writerow(row)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+
+
+SINKS = {
+    "count": lambda params: CountSink(),
+    "csv": lambda params: CsvSink(params.get("sink_path")),
+}
+
+
+def build_sink(params: dict):
+    sink_type = (params or {}).get("sink", "count")
+    factory = SINKS.get(sink_type)
+    if factory is None:
+        raise ValueError(f"Unknown stream sink '{sink_type}'. Available: {list(SINKS)}")
+    return factory(params or {})
+
+
+def stream_select(conn, sql: str, sink, itersize: int = DEFAULT_ITERSIZE, args=None) -> int:
+    """
+    Chạy SELECT qua named (server-side) cursor, đọc từng lô `itersize` dòng
+    và đẩy vào sink. Bộ nhớ chỉ giữ một lô dù kết quả lớn đến đâu.
+    Trả về số dòng đã đọc.
+    """
+    cursor = conn.cursor(name=f"task_stream_{uuid.uuid4().hex}")
+    cursor.itersize = max(1, int(itersize))
+    row_count = 0
+    try:
+        cursor.execute(sql, args)
+        opened = False
+        for row in cursor:
+            if not opened:
+                sink.open([col[0] for col in cursor.description])
+                opened = True
+            sink.write(row)
+            row_count += 1
+        if not opened and cursor.description:
+            sink.open([col[0] for col in cursor.description])
+    finally:
+        sink.close()
+        cursor.close()
+    return row_count
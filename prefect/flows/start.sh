@@ -23,13 +23,22 @@ prefect server start --host 0.0.0.0 --port 4200 &
 SERVER_PID=$!
 sleep 60
 
-echo "== CREATE WORK POOL (if not exists) =="
-prefect work-pool create -t process local-process-pool || true
+# Các pool được backend dùng để đặt job (PREFECT_WORK_POOLS ở backend) và số worker mỗi pool
+WORK_POOLS=${WORK_POOLS:-local-process-pool}
+WORKERS_PER_POOL=${WORKERS_PER_POOL:-1}
+WORKER_PIDS=()
+
+for POOL in ${WORK_POOLS//,/ }; do
+  echo "== CREATE WORK POOL $POOL (if not exists) =="
+  prefect work-pool create -t process "$POOL" || true
+
+  for i in $(seq 1 "$WORKERS_PER_POOL"); do
+    echo "== STARTING PREFECT WORKER $POOL-$i =="
+    prefect worker start --pool "$POOL" --type process --name "$POOL-worker-$i" &
+    WORKER_PIDS+=($!)
+  done
+done
 
-echo "== STARTING PREFECT WORKER =="
-prefect worker start --pool local-process-pool --type process &
-
-WORKER_PID=$!
 sleep 20
 
 echo "== SERVING FLOW =="
@@ -37,4 +46,6 @@ python my_flows.py
 
 
 wait $SERVER_PID
-wait $WORKER_PID
+for PID in "${WORKER_PIDS[@]}"; do
+  wait $PID
+done
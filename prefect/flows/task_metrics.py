@@ -0,0 +1,109 @@
+import resource
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from db_pool import pooled_connection
+from log_writer import BufferedTableWriter
+
+
+_active_writer = None
+
+
+class TaskMetrics:
+    """
+    Đo tài nguyên của một task run: wall time, thời gian chờ DB, số dòng,
+    CPU time của thread chạy task và mức tăng peak RSS của worker process.
+    """
+
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self._rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        self.db_seconds = 0.0
+        self.extra_cpu_seconds = 0.0
+        self.rows_returned = None
+        self.rows_affected = None
+
+    @contextmanager
+    def db_timer(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.db_seconds += time.perf_counter() - started
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.cpu_seconds = time.thread_time() - self._cpu_start + self.extra_cpu_seconds
+        # ru_maxrss là peak của cả process (KB trên Linux): chỉ tăng khi task
+        # này đẩy peak lên, các task chạy song song có thể góp phần.
+        self.peak_rss_delta_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - self._rss_start
+        self.finished_at = datetime.now()
+        return self
+
+
+class TaskMetricsWriter(BufferedTableWriter):
+    INSERT_SQL = """
+        INSERT INTO job_task_metrics (
+            job_id, flow_run_id, task_run_id, job_task_id, task_name, status, cached,
+            wall_ms, db_ms, cpu_ms, rows_returned, rows_affected, peak_rss_delta_kb,
+            started_at, finished_at
+        ) VALUES %s
+    """
+
+    def __init__(self, db_url: str, pool_size: int = 1, **kwargs):
+        super().__init__(db_url, self.INSERT_SQL, pool_size=pool_size, **kwargs)
+
+    def record(self, metrics: TaskMetrics, job_id, flow_run_id, task_run_id, job_task_id,
+               task_name, status, cached=False):
+        self.write((
+            job_id, flow_run_id, task_run_id, job_task_id, task_name, status, cached,
+            round(metrics.wall_seconds * 1000), round(metrics.db_seconds * 1000),
+            round(metrics.cpu_seconds * 1000), metrics.rows_returned, metrics.rows_affected,
+            metrics.peak_rss_delta_kb, metrics.started_at, metrics.finished_at,
+        ))
+
+
+def start_metrics_writer(db_url: str, pool_size: int = 1) -> TaskMetricsWriter:
+    global _active_writer
+    _active_writer = TaskMetricsWriter(db_url, pool_size=pool_size)
+    return _active_writer
+
+
+def get_metrics_writer():
+    return _active_writer
+
+
+def stop_metrics_writer():
+    global _active_writer
+    # Bỏ writer trước khi close: close lỗi thì run sau vẫn tạo writer mới.
+    writer, _active_writer = _active_writer, None
+    if writer is not None:
+        writer.close()
+
+
+def load_latency_baselines(db_url: str, job_id: int, samples: int = 20) -> dict:
+    """
+    {job_task_id: giây} = trung bình db_ms của `samples` lần chạy COMPLETED gần
+    nhất (không tính cache hit) của từng task trong job: baseline latency cho
+    admission control, vì mỗi flow run là process mới và mỗi task chỉ chạy một lần.
+    """
+    with pooled_connection(db_url) as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT job_task_id, AVG(db_ms) / 1000.0
+                FROM (
+                    SELECT job_task_id, db_ms,
+                           ROW_NUMBER() OVER (PARTITION BY job_task_id ORDER BY finished_at DESC) AS rn
+                    FROM job_task_metrics
+                    WHERE job_id = %s AND status = 'COMPLETED' AND NOT cached
+                      AND job_task_id IS NOT NULL AND db_ms IS NOT NULL
+                ) recent
+                WHERE rn <= %s
+                GROUP BY job_task_id
+            """, (job_id, samples))
+            rows = cur.fetchall()
+        conn.commit()
+    return {job_task_id: float(seconds) for job_task_id, seconds in rows}